@@ -0,0 +1,368 @@
+"""
+Badge to badge tic-tac-toe over UDP.
+
+Every datagram is 8 bytes:
+    0     MAGIC
+    1     message type, MSG_HELLO, MSG_NEW_GAME, MSG_MOVE or MSG_ACK
+    2     sequence number of the message, or of the message an MSG_ACK acknowledges
+    3     game number of the sender, counted up for every new game of a session
+    4     MSG_MOVE: move number (1-9) in the high nibble and the cell index in the low nibble
+    5-7   board state of the sender after the message, x_mask | o_mask << 9 little endian.
+          MSG_HELLO carries the sender's session id in bytes 5-6 instead.
+
+The board state is the state check. A move carries the board after the move and an ack carries
+the board of the badge sending it, so a badge that missed or doubled a move is found at the next
+message. The whole board fits in 18 bits, so it is sent as it is instead of a hash. When the
+boards differ the badge that noticed starts a new game, which puts both boards back in step.
+
+HELLO, NEW_GAME and MOVE are sent one at a time, in order, and resent until they are
+acknowledged: first after retry_interval ms, then at twice the previous interval up to
+max_retry_interval. A message still not acknowledged after timeout ms starts the session over.
+After max_timeouts of those in a row with nothing acknowledged in between, the other badge is
+taken to be gone and the link stops instead of pairing again forever.
+poll() never blocks, it reads every waiting datagram, answers it, and sends a retransmit if one is
+due, so it runs as a runtime task.
+
+Both badges send HELLO with a random session id, and the one with the lower id plays X. X starts
+the even numbered games and O the odd ones, so the badges agree on who starts without asking.
+A HELLO with a different session id means the other badge restarted its session, so this badge
+starts over too, at game 0.
+"""
+import random
+
+from errno import EAGAIN
+
+from metrics import ticks_ms, ticks_diff
+
+DEFAULT_PORT = 8124
+
+MESSAGE_SIZE = 8
+MAGIC = 0xb7
+
+MSG_HELLO = 1
+MSG_NEW_GAME = 2
+MSG_MOVE = 3
+MSG_ACK = 4
+
+# messages waiting to be sent or acknowledged
+OUTBOX_SIZE = 4
+
+
+def board_state(board):
+    return board.x_mask | board.o_mask << 9
+
+
+def first_piece(game_number):
+    """
+    the piece that moves first in a game
+    """
+    return "X" if game_number % 2 == 0 else "O"
+
+
+class BadgeLink:
+    """
+    Plays tic-tac-toe with the badge at peer, a (host, port) tuple.
+
+    get_board() returns the BitBoard of the game being played. on_move(cell) plays the other
+    badge's move and returns False if it could not. on_new_game(first_piece) starts a new game.
+    on_lost(stopped), if given, is called when the other badge stops answering, with stopped True
+    once the link has given up.
+    """
+
+    def __init__(self, pool, peer, get_board, on_move, on_new_game, port=DEFAULT_PORT, bind_address="0.0.0.0",
+                 retry_interval=50, max_retry_interval=400, timeout=3000, max_timeouts=5, on_lost=None):
+        self.pool = pool
+        self.peer = peer
+        self.get_board = get_board
+        self.on_move = on_move
+        self.on_new_game = on_new_game
+        self.port = port
+        self.bind_address = bind_address
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.timeout = timeout
+        self.max_timeouts = max_timeouts
+        self.on_lost = on_lost
+
+        self.socket = None
+        self.active = False
+        self.paired = False
+        self.session_id = 0
+        self.peer_session_id = None
+        self.hello_acked = False
+        self.game_number = 0
+        self.local_piece = None
+        # timeouts since the other badge last acknowledged anything
+        self.lost_count = 0
+
+        self._receive = bytearray(MESSAGE_SIZE * 2)
+        self._ack = bytearray(MESSAGE_SIZE)
+        # ring of messages, the first one is sent until it is acknowledged
+        self._outbox = [bytearray(MESSAGE_SIZE) for _ in range(OUTBOX_SIZE)]
+        self._outbox_start = 0
+        self._outbox_length = 0
+        self._sequence = 0
+        # ticks of the first send, the next retransmit and the current retry interval of the first message
+        self._first_sent = None
+        self._next_send = 0
+        self._interval = retry_interval
+
+        # counters
+        self.sent = 0
+        self.received = 0
+        self.retransmits = 0
+        self.timeouts = 0
+        self.desyncs = 0
+        self.ignored = 0
+        self.acked = 0
+        self.rtt_total = 0
+        self.rtt_max = 0
+        self.rtt_last = 0
+
+    def start(self):
+        """
+        Start a session, the other badge is paired with once both HELLOs are acknowledged.
+        """
+        if self.socket is None:
+            self.socket = self.pool.socket(self.pool.AF_INET, self.pool.SOCK_DGRAM)
+            self.socket.bind((self.bind_address, self.port))
+            self.socket.setblocking(False)
+        self.active = True
+        self.paired = False
+        self.hello_acked = False
+        self.peer_session_id = None
+        self.session_id = random.getrandbits(16)
+        self._clear_outbox()
+        self._queue_hello()
+
+    def stop(self):
+        self.active = False
+        self.paired = False
+        self.lost_count = 0
+        self._clear_outbox()
+
+    @property
+    def waiting(self):
+        """
+        True while there are messages the other badge has not acknowledged
+        """
+        return self._outbox_length > 0
+
+    def send_move(self, cell):
+        """
+        Send the move just played at cell on this badge.
+        """
+        board = self.get_board()
+        move_number = 9 - board.empty_count
+        self._queue(MSG_MOVE, move_number << 4 | cell, board_state(board))
+
+    def request_new_game(self):
+        """
+        Start the next game on both badges.
+        """
+        self._start_game((self.game_number + 1) & 0xff)
+        self._queue(MSG_NEW_GAME, 0, board_state(self.get_board()))
+
+    def poll(self):
+        """
+        Handle every waiting datagram, then send a retransmit if one is due.
+        """
+        if self.socket is None:
+            return
+        while True:
+            try:
+                size, address = self.socket.recvfrom_into(self._receive)
+            except OSError as error:
+                if error.errno == EAGAIN:
+                    break
+                raise
+            if not self.active:
+                continue
+            if (size != MESSAGE_SIZE or self._receive[0] != MAGIC or address[0] != self.peer[0]
+                    or address[1] != self.peer[1]):
+                self.ignored += 1
+                continue
+            self.received += 1
+            self._handle(self._receive)
+
+        if self._outbox_length and self.active:
+            self._send_due()
+
+    def _handle(self, message):
+        message_type = message[1]
+        sequence = message[2]
+        game_number = message[3]
+        if message_type == MSG_ACK:
+            self._handle_ack(sequence, message)
+            return
+
+        if message_type == MSG_HELLO:
+            peer_session_id = message[5] | message[6] << 8
+            self._send_ack(sequence)
+            if peer_session_id == self.session_id:
+                # both picked the same id, pick again
+                self.start()
+            elif peer_session_id != self.peer_session_id:
+                if self.peer_session_id is not None:
+                    # the other badge started a new session, start over with it
+                    self.start()
+                self.peer_session_id = peer_session_id
+                self._check_paired()
+            return
+
+        if not self.paired:
+            # not acknowledged, so the other badge sends it again once this one is paired
+            self.ignored += 1
+            return
+
+        if message_type == MSG_NEW_GAME:
+            if 0 < (game_number - self.game_number) & 0xff < 128:
+                self._start_game(game_number)
+            # otherwise both badges asked for the same new game, or it is a repeat
+            self._send_ack(sequence)
+        elif message_type == MSG_MOVE:
+            if game_number != self.game_number:
+                # a repeat from a game that is over
+                self._send_ack(sequence)
+                return
+            move_number = message[4] >> 4
+            played = 9 - self.get_board().empty_count
+            if move_number > played + 1:
+                # a move is missing, wait for it to be sent again
+                self.ignored += 1
+                return
+            if move_number == played + 1:
+                if not self.on_move(message[4] & 0x0f) or board_state(self.get_board()) != self._state(message):
+                    self._desync()
+            self._send_ack(sequence)
+        else:
+            self.ignored += 1
+
+    def _handle_ack(self, sequence, message):
+        if not self._outbox_length:
+            return
+        head = self._outbox[self._outbox_start]
+        if head[2] != sequence:
+            return
+        self.lost_count = 0
+        if self._first_sent is not None:
+            rtt = ticks_diff(ticks_ms(), self._first_sent)
+            self.acked += 1
+            self.rtt_last = rtt
+            self.rtt_total += rtt
+            if rtt > self.rtt_max:
+                self.rtt_max = rtt
+        self._outbox_start = (self._outbox_start + 1) % OUTBOX_SIZE
+        self._outbox_length -= 1
+        self._first_sent = None
+
+        if head[1] == MSG_HELLO:
+            self.hello_acked = True
+            self._check_paired()
+        elif head[1] == MSG_MOVE and message[3] == head[3]:
+            # the other badge may have played its reply before acknowledging a resent move,
+            # so its board only has to hold every piece of this one
+            state = self._state(head)
+            if self._state(message) & state != state:
+                self._desync()
+
+        if self._outbox_length:
+            # send the next message right away
+            self._send_due()
+
+    def _check_paired(self):
+        if self.paired or not self.hello_acked or self.peer_session_id is None:
+            return
+        self.paired = True
+        self.local_piece = "X" if self.session_id < self.peer_session_id else "O"
+        self._start_game(0)
+
+    def _start_game(self, game_number):
+        self.game_number = game_number
+        self.on_new_game(first_piece(game_number))
+
+    def _desync(self):
+        self.desyncs += 1
+        print(f"boards differ in game {self.game_number}, starting a new game")
+        self.request_new_game()
+
+    def _state(self, message):
+        return message[5] | message[6] << 8 | message[7] << 16
+
+    def _queue_hello(self):
+        self._queue(MSG_HELLO, 0, self.session_id)
+
+    def _queue(self, message_type, data, state):
+        if self._outbox_length == OUTBOX_SIZE:
+            # the other badge has stopped answering
+            self._lost()
+            return
+        message = self._outbox[(self._outbox_start + self._outbox_length) % OUTBOX_SIZE]
+        self._sequence = (self._sequence + 1) & 0xff
+        self._fill(message, message_type, self._sequence, data, state)
+        self._outbox_length += 1
+        if self._outbox_length == 1:
+            self._send_due()
+
+    def _fill(self, message, message_type, sequence, data, state):
+        message[0] = MAGIC
+        message[1] = message_type
+        message[2] = sequence
+        message[3] = self.game_number
+        message[4] = data
+        message[5] = state & 0xff
+        message[6] = (state >> 8) & 0xff
+        message[7] = state >> 16
+
+    def _send_due(self):
+        now = ticks_ms()
+        if self._first_sent is None:
+            self._first_sent = now
+            self._interval = self.retry_interval
+        elif ticks_diff(now, self._next_send) < 0:
+            return
+        elif ticks_diff(now, self._first_sent) >= self.timeout:
+            self._lost()
+            return
+        else:
+            self.retransmits += 1
+            self._interval = min(self._interval * 2, self.max_retry_interval)
+        self._next_send = now + self._interval
+        self._send(self._outbox[self._outbox_start])
+
+    def _send_ack(self, sequence):
+        self._fill(self._ack, MSG_ACK, sequence, 0, board_state(self.get_board()))
+        self._send(self._ack)
+
+    def _send(self, message):
+        try:
+            self.socket.sendto(message, self.peer)
+            self.sent += 1
+        except OSError as error:
+            # counted like a lost datagram, the message is sent again
+            print(f"badge link send failed: {error}")
+
+    def _lost(self):
+        self.timeouts += 1
+        self.lost_count += 1
+        if self.lost_count >= self.max_timeouts:
+            print(f"no answer from the other badge after {self.lost_count} tries, stopping")
+            self.stop()
+            if self.on_lost is not None:
+                self.on_lost(True)
+            return
+        print("no answer from the other badge, pairing again")
+        self.start()
+        if self.on_lost is not None:
+            self.on_lost(False)
+
+    def _clear_outbox(self):
+        self._outbox_start = 0
+        self._outbox_length = 0
+        self._first_sent = None
+
+    def report(self):
+        average = self.rtt_total / self.acked if self.acked else 0
+        return (f"badge link paired: {self.paired} game: {self.game_number} sent: {self.sent} received: {self.received} "
+                f"retransmits: {self.retransmits} rtt avg: {average:.1f}ms max: {self.rtt_max}ms "
+                f"timeouts: {self.timeouts} desyncs: {self.desyncs} ignored: {self.ignored}")
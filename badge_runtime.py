@@ -0,0 +1,108 @@
+"""
+Cooperative asyncio runtime for the badge main loop.
+
+Each piece of work (HTTP serving, button handling, LED animation, display refreshes) is added as a
+plain function that does one short step of work. The runtime runs every step function in its own
+asyncio task at a fixed interval and keeps timing stats for it, so a slow step only delays the other
+tasks until it finishes, instead of for a whole pass of a serial loop.
+
+Times are kept in integer nanoseconds from time.monotonic_ns(). The float time.monotonic() loses
+precision as the badge stays on, after a few hours it only moves in steps of several milliseconds,
+which is as long as a task interval.
+
+An exception from a step is printed and counted for its task, and the task keeps running, so one
+failing step does not stop the badge.
+"""
+import asyncio
+import time
+
+
+class RuntimeTask:
+    """
+    A step function that the runtime calls every interval seconds, with timing stats.
+    The stats are in nanoseconds.
+    """
+
+    def __init__(self, name, step, interval, budget):
+        self.name = name
+        self.step = step
+        self.interval = int(interval * 1_000_000_000)
+        # longest a single step should take, steps that take longer are counted as overruns
+        self.budget = int(budget * 1_000_000_000)
+
+        self.steps = 0
+        self.overruns = 0
+        self.errors = 0
+        self.max_step_time = 0
+        # how late a step started compared with when it was scheduled
+        self.max_latency = 0
+        self.total_latency = 0
+
+    def record(self, scheduled, started, finished):
+        self.steps += 1
+        step_time = finished - started
+        if step_time > self.max_step_time:
+            self.max_step_time = step_time
+        if step_time > self.budget:
+            self.overruns += 1
+        latency = started - scheduled
+        if latency > 0:
+            self.total_latency += latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+
+    def report(self):
+        average_latency = self.total_latency / self.steps if self.steps else 0
+        return (f"{self.name}: steps: {self.steps} overruns: {self.overruns} errors: {self.errors} "
+                f"max step: {self.max_step_time / 1_000_000:.1f}ms "
+                f"avg latency: {average_latency / 1_000_000:.1f}ms max latency: {self.max_latency / 1_000_000:.1f}ms")
+
+
+class BadgeRuntime:
+    """
+    Runs the added tasks cooperatively with asyncio until stop() is called.
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self.running = False
+
+    def add_task(self, name, step, interval, budget):
+        """
+        Add a step function to call every interval seconds. budget is the longest one step should take.
+        """
+        task = RuntimeTask(name, step, interval, budget)
+        self.tasks.append(task)
+        return task
+
+    async def _run_task(self, task):
+        scheduled = time.monotonic_ns()
+        while self.running:
+            started = time.monotonic_ns()
+            try:
+                task.step()
+            except Exception as error:  # pylint: disable=broad-except
+                task.errors += 1
+                print(f"{task.name} step failed: {error!r}")
+            finished = time.monotonic_ns()
+            task.record(scheduled, started, finished)
+
+            # schedule from the previous slot so timing does not drift, but skip
+            # slots that were missed instead of running them back to back
+            scheduled += task.interval
+            if scheduled < finished:
+                scheduled = finished
+            await asyncio.sleep((scheduled - finished) / 1_000_000_000)
+
+    async def main(self):
+        self.running = True
+        await asyncio.gather(*[asyncio.create_task(self._run_task(task)) for task in self.tasks])
+
+    def run(self):
+        asyncio.run(self.main())
+
+    def stop(self):
+        self.running = False
+
+    def report(self):
+        return "\n".join(task.report() for task in self.tasks)
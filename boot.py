@@ -18,7 +18,21 @@ a_btn.pull = digitalio.Pull.DOWN
 
 if a_btn.value and up_btn.value and down_btn.value:
     print("up, down, a pressed. resetting highscore")
-    import foamyguy_nvm_helper as nvm_helper
+    from score_journal import ScoreJournal
 
-    all_time_score = {"X": 0, "O": 0}
-    nvm_helper.save_data(all_time_score, test_run=False)
\ No newline at end of file
+    ScoreJournal().reset()
+
+b_btn = digitalio.DigitalInOut(board.SW_B)
+b_btn.direction = digitalio.Direction.INPUT
+b_btn.pull = digitalio.Pull.DOWN
+
+# Holding B at reset lets code.py write CIRCUITPY, so the game log in sd/ is kept. The computer
+# sees the drive read only until the next reset without B held.
+if b_btn.value:
+    import storage
+
+    try:
+        storage.remount("/", readonly=False)
+        print("b pressed. CIRCUITPY is writable by code.py, the game log is kept")
+    except RuntimeError as e:
+        print(f"could not remount CIRCUITPY: {e}")
@@ -1,4 +1,10 @@
+# imported first so the boot trace also covers the time spent importing everything else
+from metrics import Metrics, BootTrace
+
+boot_trace = BootTrace()
+
 import gc
+import os
 import random
 import time
 import board
@@ -8,21 +14,18 @@ import keypad
 import socketpool
 import wifi
 import terminalio
-from adafruit_display_text import bitmap_label as label
 import neopixel
 
-from adafruit_led_animation.sequence import AnimationSequence
-from adafruit_led_animation.animation.rainbow import Rainbow
-from adafruit_led_animation.animation.rainbowchase import RainbowChase
-from adafruit_led_animation.animation.rainbowcomet import RainbowComet
-from adafruit_led_animation.animation.rainbowsparkle import RainbowSparkle
 from adafruit_led_animation.color import WHITE, BLACK
 
-import foamyguy_nvm_helper as nvm_helper
-from adafruit_httpserver import Server, Route, as_route, Request, Response, FileResponse, GET, POST
+# only what the badge screen and LEDs need is imported before the first frame. Compiling .py
+# modules is most of the import time, so the web and runtime modules are imported after the first
+# refresh and the game modules by build_game().
+from refresh_scheduler import RefreshScheduler
+from led_output import LedOutput
+from lut_animation import LutAnimationSequence, rainbow, rainbow_chase, rainbow_comet, rainbow_sparkle
 
-pool = socketpool.SocketPool(wifi.radio)
-server = Server(pool, "/static", debug=True)
+boot_trace.mark("imports")
 
 STATE_BADGE = 0
 STATE_TIC_TAC_TOE = 1
@@ -34,6 +37,11 @@ CURRENT_STATE = STATE_BADGE
 CHANGE_STATE_BTN_COOLDOWN = 0.75
 LAST_STATE_CHANGE = -1
 
+# main loop instrumentation served at /metrics. When False nothing is recorded and the
+# main loop calls the step functions directly.
+METRICS_ENABLED = True
+metrics = Metrics(enabled=METRICS_ENABLED, boot_trace=boot_trace)
+
 # Button numbers
 BUTTON_UP = 0
 BUTTON_DOWN = 1
@@ -43,39 +51,86 @@ BUTTON_C = 4
 
 # NeoPixel and Animations setup
 pixels = neopixel.NeoPixel(board.SDA, 8)
-rainbow = Rainbow(pixels, speed=0.1, period=2)
-rainbow_comet = RainbowComet(pixels, speed=0.1, tail_length=11, bounce=True)
-rainbow_sparkle = RainbowSparkle(pixels, speed=0.1, num_sparkles=5)
-rainbow_chase = RainbowChase(pixels, speed=0.1, size=5, spacing=3)
-animations = AnimationSequence(
-    rainbow_comet, rainbow, rainbow_sparkle, rainbow_chase, advance_interval=45,
+# all LED writes go through leds, which skips writes that would not change the strip
+leds = LedOutput(pixels, brightness=pixels.brightness)
+# every frame of every animation is computed up front, see lut_animation.py
+animations = LutAnimationSequence(
+    leds,
+    rainbow_comet(len(leds), speed=0.1, tail_length=11, bounce=True),
+    rainbow(speed=0.1, period=2),
+    rainbow_sparkle(speed=0.1, num_sparkles=5),
+    rainbow_chase(speed=0.1, size=5, spacing=3),
+    advance_interval=45,
 )
+animations.animate()
+boot_trace.mark("leds")
 
 # display setup
 display = board.DISPLAY
-tictactoe_group = displayio.Group()
+# every display refresh goes through the scheduler so rapid requests get merged
+refresher = RefreshScheduler(display)
+
+badge_group = displayio.Group()
+
+badge_odb = displayio.OnDiskBitmap("badge.BMP")
+badge_tg = displayio.TileGrid(bitmap=badge_odb, pixel_shader=badge_odb.pixel_shader)
+badge_group.append(badge_tg)
+
+# the tic-tac-toe screen is built the first time the game is started, see build_game()
+tictactoe_group = None
+
+
+def set_state(new_state):
+    if new_state == STATE_BADGE:
+        display.root_group = badge_group
+    elif new_state == STATE_TIC_TAC_TOE:
+        display.root_group = tictactoe_group
+    refresher.request()
+
 
-# background color palette
-background_p = displayio.Palette(1)
-background_p[0] = 0xffffff
+# show the badge before setting up anything else
+set_state(CURRENT_STATE)
+refresher.poll()
+boot_trace.mark("first frame")
+
+import foamyguy_nvm_helper as nvm_helper
+from badge_runtime import BadgeRuntime
+from score_journal import ScoreJournal
+from game_log import GameLog, RESULT_DRAW, RESULT_O_WINS, RESULT_X_WINS
+from badge_link import BadgeLink, DEFAULT_PORT
+from response_cache import RenderCache
+from control_api import LedBatch, ScoreStream
+from static_files import StaticFiles, StaticFileResponse
+from input_router import InputRouter, EDGE_RELEASED
+from adafruit_httpserver import Server, Route, as_route, Request, Response, FileResponse, JSONResponse, \
+    SSEResponse, Status, OK_200, BAD_REQUEST_400, GET, POST
+
+boot_trace.mark("web imports")
 
-print(f"width: {display.width}")
-# make a rectangle same size as display and add it to main group
-background_rect = vectorio.Rectangle(pixel_shader=background_p, width=display.width + 1, height=display.height, x=0,
-                                     y=0)
-tictactoe_group.append(background_rect)
+pool = socketpool.SocketPool(wifi.radio)
+server = Server(pool)
 
 session_score = {"X": 0, "O": 0}
 
+# keep the game sprites in RAM (1600 bytes) instead of reading them from flash on every refresh
+SPRITES_IN_RAM = True
+
 
 class TicTacToeGame(displayio.Group):
     """
     Helper class to hold the visual and logical elements that make up the game.
     """
 
-    def __init__(self, display):
+    # width and height of the selector and piece sprites
+    SPRITE_SIZE = 30
+
+    # where the top left cell of the board sprites is drawn
+    BOARD_ORIGIN = 6
+
+    def __init__(self, display, refresher, sprites_in_ram=SPRITES_IN_RAM):
         super().__init__()
         self.display = display
+        self.refresher = refresher
 
         # board lines color palette
         self.lines_p = displayio.Palette(1)
@@ -94,30 +149,21 @@ class TicTacToeGame(displayio.Group):
         self.bottom_line = vectorio.Rectangle(pixel_shader=self.lines_p, width=118, height=2, y=80, x=5)
         self.append(self.bottom_line)
 
-        #  dotted line box selector indicator
-        self.selector_bmp = displayio.OnDiskBitmap("selector.bmp")
-        self.selector_tg = displayio.TileGrid(pixel_shader=self.selector_bmp.pixel_shader, bitmap=self.selector_bmp)
-        self.append(self.selector_tg)
-
-        # X and O piece bmps
-        self.x_bmp = displayio.OnDiskBitmap("x.bmp")
-        self.o_bmp = displayio.OnDiskBitmap("o.bmp")
-
-        # mapping of board position indexes to pixel locations
-        self.selector_location_map = [
-            [(7, 7), (45, 7), (85, 7)],
-            [(7, 45), (45, 45), (85, 45)],
-            [(7, 85), (45, 85), (85, 85)],
-        ]
+        # selector and pieces, one tile per board cell from the sprite atlas, indexed like the bitboard.
+        # A cell's tile is its piece tile plus TILE_SELECTOR when the selector is on it.
+        self.sprites_bmp, self.sprites_palette = load_atlas(in_ram=sprites_in_ram)
+        self.board_tg = displayio.TileGrid(self.sprites_bmp, pixel_shader=self.sprites_palette, width=3, height=3,
+                                           tile_width=TILE_SIZE, tile_height=TILE_SIZE, default_tile=TILE_BLANK,
+                                           x=self.BOARD_ORIGIN, y=self.BOARD_ORIGIN)
+        self.append(self.board_tg)
 
         # set starting position of the selector
         self.selector_position = [random.randint(0, 2), random.randint(0, 2)]
+        # cell the selector is drawn at
+        self.selector_cell = cell_index(self.selector_position)
 
-        # move the selector tilegrid to the starting position, but do not refresh yet
-        self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg, refresh=False)
-
-        # list that will hold all X and O piece TileGrids, added as they get played.
-        self.played_pieces = []
+        # draw the selector at the starting position, but do not refresh yet
+        self.place_selector(refresh=False)
 
         # 2D list representation of the board state
         self.board_state = [
@@ -126,86 +172,98 @@ class TicTacToeGame(displayio.Group):
             ["", "", ""],
         ]
 
-        self.winner_line_polygon = None
+        # bitboard copy of the board state used for win checks and finding empty spaces
+        self.bitboard = BitBoard()
+
+        # cell index of each move in the order they were played, for the game log
+        self.moves = bytearray(9)
+        self.move_count = 0
+        self.first_player = None
+
         self.winner_line_palette = displayio.Palette(1)
         self.winner_line_palette[0] = 0x000000
 
         self.winner_line_map = {
-            "row-0": ((12, 17), (12, 23), (115, 23), (115, 17)),
-            "row-1": ((12, 57), (12, 63), (115, 63), (115, 57)),
-            "row-2": ((12, 97), (12, 103), (115, 103), (115, 97)),
-            "col-0": ((20, 12), (26, 12), (26, 115), (20, 115)),
-            "col-1": ((58, 12), (64, 12), (64, 115), (58, 115)),
-            "col-2": ((98, 12), (104, 12), (104, 115), (98, 115)),
-            "diag-tld": ((5, 15), (15, 5), (115, 105), (105, 115)),
-            "diag-bru": ((5, 105), (15, 115), (115, 15), (105, 5)),
+            "row-0": [(12, 17), (12, 23), (115, 23), (115, 17)],
+            "row-1": [(12, 57), (12, 63), (115, 63), (115, 57)],
+            "row-2": [(12, 97), (12, 103), (115, 103), (115, 97)],
+            "col-0": [(20, 12), (26, 12), (26, 115), (20, 115)],
+            "col-1": [(58, 12), (64, 12), (64, 115), (58, 115)],
+            "col-2": [(98, 12), (104, 12), (104, 115), (98, 115)],
+            "diag-tld": [(5, 15), (15, 5), (115, 105), (105, 115)],
+            "diag-bru": [(5, 105), (15, 115), (115, 15), (105, 5)],
         }
 
+        # winner line polygon, kept hidden on top of the pieces until there is a winner
+        self.winner_line_polygon = vectorio.Polygon(pixel_shader=self.winner_line_palette,
+                                                    points=self.winner_line_map["row-0"], x=0, y=0)
+        self.winner_line_polygon.hidden = True
+        self.append(self.winner_line_polygon)
+
     def reset_game(self):
-        while len(self.played_pieces) > 0:
-            self.remove(self.played_pieces.pop())
+        for cell in range(9):
+            self.board_tg[cell] = TILE_BLANK
         for row_idx in range(3):
             for col_idx in range(3):
                 self.board_state[row_idx][col_idx] = ""
+        self.bitboard.reset()
+        self.move_count = 0
 
         print("board state after reset")
         print(self.board_state)
         # set starting position of the selector
-        self.selector_position = [random.randint(0, 2), random.randint(0, 2)]
+        self.selector_position[0] = random.randint(0, 2)
+        self.selector_position[1] = random.randint(0, 2)
 
-        # move the selector tilegrid to the starting position, but do not refresh yet
-        self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg, refresh=False)
+        # draw the selector at the starting position, but do not refresh yet
+        self.place_selector(refresh=False)
 
-        print(f"inside reset_game() winner line is: {self.winner_line_polygon}")
-        if self.winner_line_polygon is not None:
-            self.remove(self.winner_line_polygon)
+        self.winner_line_polygon.hidden = True
 
     def move_selector_up(self):
         if self.selector_position[1] > 0:
             self.selector_position[1] -= 1
-            self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg)
+            self.place_selector()
 
     def move_selector_down(self):
         if self.selector_position[1] < 2:
             self.selector_position[1] += 1
-            self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg)
+            self.place_selector()
 
     def move_selector_left(self):
         if self.selector_position[0] > 0:
             self.selector_position[0] -= 1
-            self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg)
+            self.place_selector()
 
     def move_selector_right(self):
         if self.selector_position[0] < 2:
             self.selector_position[0] += 1
-            self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg)
+            self.place_selector()
 
     def play_piece_at(self, piece, position, refresh=False):
-        # create the right type of TileGrid based on turn
-        if piece == "X":
-            piece_tg = displayio.TileGrid(pixel_shader=self.x_bmp.pixel_shader, bitmap=self.x_bmp)
-        else:  # O's turn
-            piece_tg = displayio.TileGrid(pixel_shader=self.o_bmp.pixel_shader, bitmap=self.o_bmp)
-
-        # append it to self Group instance
-        self.append(piece_tg)
+        cell = cell_index(position)
 
-        # append it to pieces list so we can remove it later
-        self.played_pieces.append(piece_tg)
+        # show the piece tile at this cell, keeping the selector if it is there
+        self.board_tg[cell] = PIECE_TILES[piece] | (self.board_tg[cell] & TILE_SELECTOR)
 
-        # move piece TileGrid to the current selected position, but do not refresh
-        # unless refresh arg was True
-        self.place_tilegrid_at_board_position(position, piece_tg, refresh=refresh)
+        # do not refresh unless refresh arg was True
+        if refresh:
+            self.refresher.request(self.cell_region(cell))
 
         # update the board state with this move
-        self.board_state[self.selector_position[1]][self.selector_position[0]] = piece
+        self.board_state[position[1]][position[0]] = piece
+        self.bitboard.play(piece, cell)
+        if self.move_count == 0:
+            self.first_player = piece
+        self.moves[self.move_count] = cell
+        self.move_count += 1
 
     def play_current_move(self):
         """
         Place a piece at the selected position based on which turn it is currently.
         """
 
-        self.play_piece_at(self.turn, self.selector_position, refresh=False)
+        self.play_piece_at(self.turn, self.selector_position, refresh=True)
 
         # set the turn to next players
         self.turn = "X" if self.turn == "O" else "O"
@@ -214,58 +272,26 @@ class TicTacToeGame(displayio.Group):
         for row in self.board_state:
             print(row)
 
-        try:
+        empty_count = self.bitboard.empty_count
+        if empty_count > 0:
             # update selector_position to a random empty location
-            self.selector_position = random.choice(self.empty_spots)
-        except IndexError:
-            # no more empty spaces
-            pass
+            empty_idx = self.bitboard.nth_empty(random.randint(0, empty_count - 1))
+            self.selector_position[0] = empty_idx % 3
+            self.selector_position[1] = empty_idx // 3
 
-        # move the selector TileGrid to the selector_position and refresh
-        self.place_tilegrid_at_board_position(self.selector_position, self.selector_tg, refresh=False)
+        # move the selector to the selector_position and refresh, this gets
+        # merged with the piece refresh above by the refresh scheduler
+        self.place_selector(refresh=True)
 
     def check_winner(self):
-        winner = None
-        # horizontals:
-        for row_idx, row in enumerate(self.board_state):
-            if row.count(row[0]) == 3 and row[0] != "":
-                winner = row[0]
-                return winner, f"row-{row_idx}"
-        # verticals
-        for col_idx in range(len(self.board_state)):
-            col = []
-            for row in self.board_state:
-                col.append(row[col_idx])
-
-            if col.count(col[0]) == 3 and col[0] != "":
-                winner = col[0]
-                return winner, f"col-{col_idx}"
-        # diagonals
-        top_left_down = []
-        bottom_right_up = []
-
-        for i in range(3):
-            top_left_down.append(self.board_state[i][i])
-            bottom_right_up.append(self.board_state[2 - i][i])
-
-        if top_left_down.count(top_left_down[0]) == 3 and top_left_down[0] != "":
-            winner = top_left_down[0]
-            return winner, f"diag-tld"
-
-        if bottom_right_up.count(bottom_right_up[0]) == 3 and bottom_right_up[0] != "":
-            winner = bottom_right_up[0]
-            return winner, f"diag-bru"
-
-        return None
+        """
+        returns (winner, line_key) if a player has three in a row, otherwise None
+        """
+        return self.bitboard.check_winner()
 
     def show_winner_line(self, line_type):
-        if self.winner_line_polygon is None:
-            self.winner_line_polygon = vectorio.Polygon(pixel_shader=self.winner_line_palette,
-                                                        points=list(self.winner_line_map[line_type]), x=0, y=0)
-            self.append(self.winner_line_polygon)
-        else:
-            self.winner_line_polygon.points = list(self.winner_line_map[line_type])
-            self.append(self.winner_line_polygon)
+        self.winner_line_polygon.points = self.winner_line_map[line_type]
+        self.winner_line_polygon.hidden = False
 
     @property
     def empty_spots(self):
@@ -273,90 +299,188 @@ class TicTacToeGame(displayio.Group):
         returns a list of empty board positions
         """
         empty_spots = []
-        for row in range(3):
-            for col in range(3):
-
-                if self.board_state[col][row] == "":
-                    empty_spots.append([row, col])
+        empty_mask = self.bitboard.empty_mask
+        for idx in range(9):
+            if empty_mask & (1 << idx):
+                empty_spots.append([idx % 3, idx // 3])
         return empty_spots
 
-    def place_tilegrid_at_board_position(self, board_position, tilegrid, refresh=True):
+    def cell_region(self, cell):
         """
-        place a tilegrid at a specified board_position. Optionally refresh the display afterward.
+        returns the (x, y, width, height) display region of the sprite in a cell
         """
-        if 0 <= board_position[0] <= 2 and 0 <= board_position[1] <= 2:
-            tilegrid.x, tilegrid.y = self.selector_location_map[board_position[1]][board_position[0]]
+        return (self.BOARD_ORIGIN + (cell % 3) * TILE_SIZE, self.BOARD_ORIGIN + (cell // 3) * TILE_SIZE,
+                self.SPRITE_SIZE, self.SPRITE_SIZE)
+
+    def place_selector(self, refresh=True):
+        """
+        draw the selector at selector_position. Optionally request a refresh of the
+        old and new locations afterward.
+        """
+        if 0 <= self.selector_position[0] <= 2 and 0 <= self.selector_position[1] <= 2:
+            old_cell = self.selector_cell
+            self.board_tg[old_cell] = self.board_tg[old_cell] & ~TILE_SELECTOR
+            self.selector_cell = cell_index(self.selector_position)
+            self.board_tg[self.selector_cell] = self.board_tg[self.selector_cell] | TILE_SELECTOR
             if refresh:
-                self.display.refresh()
+                self.refresher.request(self.cell_region(old_cell))
+                self.refresher.request(self.cell_region(self.selector_cell))
         else:
-            print(f"position: {board_position} is out of bounds")
-
+            print(f"position: {self.selector_position} is out of bounds")
 
-# create the game instance
-game = TicTacToeGame(display)
-
-# add it to main group
-tictactoe_group.append(game)
 
 # button keys setup
 buttons = keypad.Keys((board.SW_UP, board.SW_DOWN, board.SW_A, board.SW_B, board.SW_C), value_when_pressed=True)
-pressed_buttons = []
 
-badge_group = displayio.Group()
+# score text, each {} is a field of digits drawn from the font's glyph tiles, see score_widget.py.
+# The fields have a fixed width, these fit both score blocks side by side on the 296 pixel display.
+# The all time scores can reach 65535, the largest score the score journal stores.
+SESSION_SCORE_TEMPLATE_STR = "Score\nRound:\n X: {}\n O: {}"
+SESSION_SCORE_DIGITS = 2
+ALL_SCORE_TEMPLATE_STR = "\nAll:\nX:{}\nO:{}"
+ALL_SCORE_DIGITS = 5
+
+# game and score labels, created by build_game()
+game = None
+session_score_text = None
+all_score_text = None
+mode_text = None
+
+# all time scores are rebuilt by replaying the score journal in NVM
+score_journal = ScoreJournal()
+if not score_journal.load():
+    # first start with the journal, carry over the scores saved with nvm_helper
+    try:
+        legacy_score = nvm_helper.read_data()
+    except EOFError:
+        # No data in NVM
+        legacy_score = {"X": 0, "O": 0}
+    score_journal.reset(legacy_score["X"], legacy_score["O"])
+all_time_score = score_journal.scores
 
-badge_odb = displayio.OnDiskBitmap("badge.BMP")
-badge_tg = displayio.TileGrid(bitmap=badge_odb, pixel_shader=badge_odb.pixel_shader)
-badge_group.append(badge_tg)
+# every finished game is appended to a binary log in sd/, with statistics kept as games end
+game_log = GameLog()
+game_log.load()
 
-SESSION_SCORE_TEMPLATE_STR = "Score\nRound:\n X: {}\n O: {}"
-session_score_text = label.Label(terminalio.FONT,
-                                 text=SESSION_SCORE_TEMPLATE_STR.format(session_score["X"], session_score["O"]),
-                                 color=BLACK, scale=2, line_spacing=1.1)
-
-session_score_text.anchor_point = (0, 0)
-session_score_text.anchored_position = (134, 2)
-tictactoe_group.append(session_score_text)
-
-all_time_score = None
-try:
-    all_time_score = nvm_helper.read_data()
-except EOFError:
-    # No data in NVM
-    all_time_score = {"X": 0, "O": 0}
-    nvm_helper.save_data(all_time_score, test_run=False)
-
-ALL_SCORE_TEMPLATE_STR = "\nAll:\n X: {}\n O: {}"
-all_score_text = label.Label(terminalio.FONT,
-                             text=ALL_SCORE_TEMPLATE_STR.format(all_time_score["X"], all_time_score["O"]),
-                             color=BLACK, scale=2, line_spacing=1.1)
-
-all_score_text.anchor_point = (1.0, 0)
-all_score_text.anchored_position = (display.width - 2, 2)
-tictactoe_group.append(all_score_text)
-
-if wifi.radio.ipv4_address:
-    ip_text = label.Label(terminalio.FONT,
-                          text=f"IP: {str(wifi.radio.ipv4_address)}",
-                          color=BLACK)
-    ip_text.anchor_point = (1.0, 1.0)
-    ip_text.anchored_position = (display.width-2, display.height-2)
-    tictactoe_group.append(ip_text)
+# game modes, cycled by pressing BUTTON_UP on the game over screen. Mode 0 is two players
+# sharing the buttons, mode n plays against the badge at move_table difficulty n - 1. The names
+# are kept here so the game statistics can be served without importing move_table.
+GAME_MODE_NAMES = ("2 players", "vs badge: easy", "vs badge: medium", "vs badge: hard")
+game_mode_index = 0
 
-def set_state(new_state):
-    if new_state == STATE_BADGE:
-        display.root_group = badge_group
-    elif new_state == STATE_TIC_TAC_TOE:
-        display.root_group = tictactoe_group
-    try:
-        display.refresh()
-    except RuntimeError as e:
-        print("Caught Runtime error, probably refreshed too soon.")
-        print(e)
-        time.sleep(display.time_to_refresh + 0.6)
-        display.refresh()
+# piece the badge plays in single player mode
+BADGE_PIECE = "O"
+
+# loaded the first time a single player mode is selected
+move_table = None
+
+
+def game_mode_name(mode_index=None):
+    return GAME_MODE_NAMES[game_mode_index if mode_index is None else mode_index]
+
+
+def next_game_mode():
+    global game_mode_index, move_table
+    game_mode_index = (game_mode_index + 1) % len(GAME_MODE_NAMES)
+    if game_mode_index and move_table is None:
+        from move_table import MoveTable  # pylint: disable=import-outside-toplevel
+
+        move_table = MoveTable("moves.bin")
+    mode_text.text = game_mode_name()
+    print(f"game mode: {game_mode_name()}")
+
+
+# per game memory numbers, printed when a game ends. Free memory going up between
+# two checks means a garbage collection ran in between. Free memory is only read once per
+# move, so both numbers are lower bounds: what was allocated before a collection in the same
+# move is lost, and several collections within one move count as one. They show whether a
+# game allocates at all, not how much.
+game_memory = {"last_free": gc.mem_free(), "allocated": 0, "collections": 0}
+
+
+def track_game_memory(new_game=False):
+    mem_free = gc.mem_free()
+    if new_game:
+        game_memory["allocated"] = 0
+        game_memory["collections"] = 0
+    elif mem_free > game_memory["last_free"]:
+        game_memory["collections"] += 1
+    else:
+        game_memory["allocated"] += game_memory["last_free"] - mem_free
+    game_memory["last_free"] = mem_free
+
+
+def print_game_memory():
+    print(f"game memory (lower bound): allocated at least {game_memory['allocated']} bytes, "
+          f"at least {game_memory['collections']} collections")
+
+
+def update_score_text():
+    session_score_text.set_value(0, session_score["X"])
+    session_score_text.set_value(1, session_score["O"])
+    all_score_text.set_value(0, all_time_score["X"])
+    all_score_text.set_value(1, all_time_score["O"])
+
+
+def finish_move():
+    """
+    Check for a winner after a move. Updates the scores and switches to the game over state
+    if there is one. Returns True if the game ended.
+    """
+    global CURRENT_STATE
+    track_game_memory()
+    winner = game.check_winner()
+    if not winner:
+        if game.bitboard.empty_count > 0:
+            return False
+        print("DRAW")
+        print_game_memory()
+        log_game(RESULT_DRAW)
+        CURRENT_STATE = STATE_TIC_TAC_TOE_GAMEOVER
+        refresher.request()
+        return True
+
+    print("WINNER:")
+    print(winner)
+    print_game_memory()
+    session_score[winner[0]] += 1
+    # updates all_time_score, the NVM write is done later by the nvm task
+    score_journal.add_win(winner[0])
+    score_stream.changed()
+    log_game(RESULT_X_WINS if winner[0] == "X" else RESULT_O_WINS)
+
+    game.show_winner_line(winner[1])
+    CURRENT_STATE = STATE_TIC_TAC_TOE_GAMEOVER
+    update_score_text()
+    refresher.request()
+    return True
+
+
+def log_game(result):
+    """
+    Add the game that just ended to the game log, the write to sd/ is done later by the game log task.
+    """
+    # games against another badge are logged as 2 player games
+    mode = 0 if network_playing() else game_mode_index
+    game_log.add_game(game.first_player, game.moves, game.move_count, result, mode)
+
+
+def play_badge_move():
+    """
+    Play the badge's move from the move table if it is the badge's turn in single player mode.
+    Returns True if the game ended.
+    """
+    if not game_mode_index or network_playing() or game.turn != BADGE_PIECE or game.bitboard.empty_count == 0:
+        return False
+
+    # the badge plays O, so it is the "me" side of the move table
+    cell = move_table.choose_move(game.bitboard.o_mask, game.bitboard.x_mask, game_mode_index - 1)
+    game.selector_position[0] = cell % 3
+    game.selector_position[1] = cell // 3
+    game.play_current_move()
+    return finish_move()
 
 
-set_state(CURRENT_STATE)
 pixel_brightness_base_value = 0
 brightness = 0.2
 
@@ -369,133 +493,407 @@ def pixel_brightness():
     return pixel_brightness_current_value
 
 
-INDEX_TEMPLATE = None
-with open("static/index.html", "r") as f:
-    INDEX_TEMPLATE = f.read()
+NOT_MODIFIED_304 = Status(304, "Not Modified")
+
+# rendered index page, only re-rendered when the color or a score changes.
+# The template is read when the first request for the page comes in.
+index_cache = RenderCache(filename="static/index.html")
 
-COLOR_PICKER_TEMPLATE = None
-with open("static/color_picker.html", "r") as f:
-    COLOR_PICKER_TEMPLATE = f.read()
+# last color set from the web page, shown in the color input
+neopixel_color = ""
+
+
+def cached_response(request: Request, cache, *values):
+    """
+    Respond with the cached rendering of a template, or 304 Not Modified if the client already has it.
+    """
+    body = cache.render(*values)
+    # no-cache makes browsers check the ETag with us before reusing their copy
+    headers = {"ETag": cache.etag, "Cache-Control": "no-cache"}
+    if cache.matches(request.headers.get("If-None-Match")):
+        return Response(request, "", status=NOT_MODIFIED_304, headers=headers)
+    return Response(request, body, content_type="text/html", headers=headers)
 
 
 @server.route("/", (GET, POST))
 def index_handler(request: Request):
+    global neopixel_color
     if request.method == GET:
 
         hex_rgb = request.query_params.get("neopixel_color")
         if hex_rgb is not None:
             hex_rgb = hex_rgb.replace("%23", "0x")
             # print(f"hex rgb: {hex(int(hex_rgb, 16))}")
-            pixels.brightness = brightness
+            leds.brightness = brightness
             animations.freeze()
             animations.fill(int(hex_rgb, 16))
+            neopixel_color = hex_rgb.replace("0x", "#")
+
+    return cached_response(request, index_cache, neopixel_color, all_time_score['X'], all_time_score['O'])
+
+
+# every file in static/ gets a route, streamed with cache headers and kept-alive connections
+static_files = StaticFiles(server, "static")
+
+led_batch = LedBatch(leds, animations)
+score_stream = ScoreStream(session_score, all_time_score)
+
+
+@server.route("/api/leds", POST)
+def leds_api_handler(request: Request):
+    """
+    Apply a batch of LED operations, see control_api.py for the JSON and binary formats.
+    """
+    global brightness
+    try:
+        if request.headers.get("Content-Type") == "application/octet-stream":
+            applied = led_batch.apply_binary(request.body)
         else:
-            hex_rgb = ""
+            applied = led_batch.apply_json(request.json())
+    except (ValueError, TypeError, IndexError, KeyError) as e:
+        return JSONResponse(request, {"error": str(e)}, status=BAD_REQUEST_400)
+    brightness = leds.brightness
+    return JSONResponse(request, {"applied": applied})
+
+
+@server.route("/api/scores", GET)
+def scores_stream_handler(request: Request):
+    """
+    Server-sent events stream of the scores, sent on connect and whenever they change.
+    """
+    response = SSEResponse(request)
+    score_stream.add(response)
+    return response
 
-    return Response(request, INDEX_TEMPLATE.format(hex_rgb.replace("0x", "#"),
-                                                   all_time_score['X'],
-                                                   all_time_score['O']), content_type="text/html")
+
+@server.route("/api/games", GET)
+def games_stats_handler(request: Request):
+    """
+    Statistics over every logged game, see game_log.py.
+    """
+    return JSONResponse(request, game_log.stats.as_dict([game_mode_name(mode) for mode in range(len(GAME_MODE_NAMES))]))
+
+
+@server.route("/api/games/log", GET)
+def games_log_handler(request: Request):
+    """
+    The raw game log, streamed from sd/ through the static file buffer. The record format is described in game_log.py.
+    """
+    game_log.flush()
+    size = game_log.log_size()
+    headers = {"Cache-Control": "no-store", "Content-Disposition": 'attachment; filename="games.bin"'}
+    return StaticFileResponse(request, static_files, game_log.log_path if size else None, size, status=OK_200,
+                              headers=headers, content_type="application/octet-stream")
 
 print(str(wifi.radio.ipv4_address))
 server.start()
 
-while True:
-    server.poll()
-    event = buttons.events.get()
-    if event:
-        if event.pressed:
-            if event.key_number not in pressed_buttons:
-                pressed_buttons.append(event.key_number)
-        elif event.released:
-            if event.key_number in pressed_buttons:
-                pressed_buttons.remove(event.key_number)
-    try:
-        if CURRENT_STATE == STATE_TIC_TAC_TOE:
-            animations.freeze()
-            animations.fill(BLACK)
-            if event:
-                print(event)
-
-                if BUTTON_A in pressed_buttons and \
-                        event.key_number == BUTTON_C and event.released:
-                    print("A held and C pressed")
-                    session_score["X"] = 0
-                    session_score["O"] = 0
-                    CURRENT_STATE = STATE_BADGE
-                    set_state(CURRENT_STATE)
-                    LAST_STATE_CHANGE = time.monotonic()
-                    continue
-
-                if event.key_number == 0 and event.released:
-                    game.move_selector_up()
-                elif event.key_number == 1 and event.released:
-                    game.move_selector_down()
-                elif event.key_number == 2 and event.released:
-                    game.move_selector_left()
-                elif event.key_number == 4 and event.released:
-                    game.move_selector_right()
-                elif event.key_number == 3 and event.released:
-
-                    if game.board_state[game.selector_position[1]][game.selector_position[0]] == "":
-                        game.play_current_move()
-                        winner = game.check_winner()
-                        if winner:
-                            print("WINNER:")
-                            print(winner)
-                            session_score[winner[0]] += 1
-                            all_time_score[winner[0]] += 1
-                            nvm_helper.save_data(all_time_score, test_run=False)
-
-                            game.show_winner_line(winner[1])
-                            CURRENT_STATE = STATE_TIC_TAC_TOE_GAMEOVER
-                            session_score_text.text = SESSION_SCORE_TEMPLATE_STR.format(session_score["X"],
-                                                                                        session_score["O"])
-                            all_score_text.text = ALL_SCORE_TEMPLATE_STR.format(all_time_score["X"],
-                                                                                all_time_score["O"])
-                            display.refresh()
-                            continue
-                        else:
-                            display.refresh()
-                    else:
-                        print("Can't play at an occupied space.")
-        elif CURRENT_STATE == STATE_TIC_TAC_TOE_GAMEOVER:
-            if event:
-                if event.released:
-                    game.reset_game()
-                    CURRENT_STATE = STATE_TIC_TAC_TOE
-                    display.refresh()
-                    continue
-        elif CURRENT_STATE == STATE_BADGE:
-            animations.animate()
-            if event:
-                if event.key_number == BUTTON_UP and event.released:
-                    print(f"free mem: {gc.mem_free()}")
-                    animations.resume()
-                    animations.next()
-                if event.key_number == BUTTON_DOWN and event.released:
-                    animations.resume()
-                    animations.previous()
-                if event.key_number == BUTTON_B and event.released:
-                    animations.freeze()
-                    animations.fill(BLACK)
-                if event.key_number == BUTTON_C and event.released:
-                    brightness = pixel_brightness()
-                    pixels.brightness = brightness
-                if LAST_STATE_CHANGE + CHANGE_STATE_BTN_COOLDOWN < time.monotonic():
-                    print(f"badged state event: {event}")
-                    if BUTTON_A in pressed_buttons and \
-                            event.key_number == BUTTON_C and event.released:
-                        print("A held and C pressed")
-                        CURRENT_STATE = STATE_TIC_TAC_TOE
-                        session_score_text.text = SESSION_SCORE_TEMPLATE_STR.format(session_score["X"],
-                                                                                    session_score["O"])
-                        set_state(CURRENT_STATE)
-                        for _element in game:
-                            print(type(_element))
-                            print(_element)
-
-    except RuntimeError as e:
-        print("Caught Runtime error, probably refreshed too soon.")
-        print(e)
-        time.sleep(display.time_to_refresh + 0.6)
-        display.refresh()
+def return_to_badge():
+    global CURRENT_STATE, LAST_STATE_CHANGE
+    print("A held and C pressed")
+    if network_playing():
+        link.stop()
+        mode_text.text = game_mode_name()
+    session_score["X"] = 0
+    session_score["O"] = 0
+    score_stream.changed()
+    CURRENT_STATE = STATE_BADGE
+    set_state(CURRENT_STATE)
+    LAST_STATE_CHANGE = time.monotonic()
+
+
+def play_selected_cell():
+    if network_playing() and (not link.paired or game.turn != link.local_piece):
+        print("Waiting for the other badge.")
+        return
+    cell = cell_index(game.selector_position)
+    if game.bitboard.is_empty(cell):
+        game.play_current_move()
+        if network_playing():
+            link.send_move(cell)
+        if not finish_move():
+            play_badge_move()
+    else:
+        print("Can't play at an occupied space.")
+
+
+def new_game():
+    global CURRENT_STATE
+    if network_playing():
+        # resets both badges through start_network_round()
+        link.request_new_game()
+        return
+    game.reset_game()
+    track_game_memory(new_game=True)
+    CURRENT_STATE = STATE_TIC_TAC_TOE
+    play_badge_move()
+    refresher.request()
+
+
+def next_mode_new_game():
+    if not network_playing():
+        next_game_mode()
+    new_game()
+
+
+def print_stats_next_animation():
+    print(f"free mem: {gc.mem_free()}")
+    print(refresher.report())
+    print(score_journal.report())
+    print(game_log.report())
+    print(f"index page {index_cache.report()}")
+    print(static_files.report())
+    print(runtime.report())
+    print(f"led writes: {leds.writes} suppressed: {leds.suppressed}")
+    print(input_router.report())
+    if link is not None:
+        print(link.report())
+    animations.resume()
+    animations.next()
+
+
+def previous_animation():
+    animations.resume()
+    animations.previous()
+
+
+def lights_off():
+    animations.freeze()
+    animations.fill(BLACK)
+
+
+def change_brightness():
+    global brightness
+    brightness = pixel_brightness()
+    leds.brightness = brightness
+
+
+def build_game():
+    """
+    Create the tic-tac-toe screen, its score labels and its button handlers.
+    """
+    global tictactoe_group, game, session_score_text, all_score_text, mode_text
+    # the game modules are only needed once the game is started, TicTacToeGame and the
+    # game button handlers use them as globals
+    global BitBoard, cell_index, load_atlas, PIECE_TILES, TILE_BLANK, TILE_SELECTOR, TILE_SIZE
+    # pylint: disable=import-outside-toplevel,redefined-outer-name
+    from adafruit_display_text import bitmap_label as label
+    from score_widget import ScoreText
+    from sprite_atlas import load_atlas, PIECE_TILES, TILE_BLANK, TILE_SELECTOR, TILE_SIZE
+    from tictactoe_engine import BitBoard, cell_index
+
+    tictactoe_group = displayio.Group()
+
+    # background color palette
+    background_p = displayio.Palette(1)
+    background_p[0] = 0xffffff
+
+    # make a rectangle same size as display and add it to main group
+    background_rect = vectorio.Rectangle(pixel_shader=background_p, width=display.width + 1,
+                                         height=display.height, x=0, y=0)
+    tictactoe_group.append(background_rect)
+
+    game = TicTacToeGame(display, refresher)
+    tictactoe_group.append(game)
+
+    session_score_text = ScoreText(SESSION_SCORE_TEMPLATE_STR, SESSION_SCORE_DIGITS, BLACK, scale=2,
+                                   line_spacing=1.1)
+    session_score_text.x, session_score_text.y = 134, 2
+    tictactoe_group.append(session_score_text)
+
+    all_score_text = ScoreText(ALL_SCORE_TEMPLATE_STR, ALL_SCORE_DIGITS, BLACK, scale=2, line_spacing=1.1)
+    all_score_text.x, all_score_text.y = display.width - 2 - all_score_text.width, 2
+    tictactoe_group.append(all_score_text)
+    update_score_text()
+
+    if wifi.radio.ipv4_address:
+        ip_text = label.Label(terminalio.FONT,
+                              text=f"IP: {str(wifi.radio.ipv4_address)}",
+                              color=BLACK)
+        ip_text.anchor_point = (1.0, 1.0)
+        ip_text.anchored_position = (display.width - 2, display.height - 2)
+        tictactoe_group.append(ip_text)
+
+    mode_text = label.Label(terminalio.FONT, text=game_mode_name(), color=BLACK)
+    mode_text.anchor_point = (1.0, 1.0)
+    mode_text.anchored_position = (display.width - 2, display.height - 14)
+    tictactoe_group.append(mode_text)
+
+    input_router.on_chord(STATE_TIC_TAC_TOE, (BUTTON_A,), BUTTON_C, EDGE_RELEASED, return_to_badge)
+    input_router.on(STATE_TIC_TAC_TOE, BUTTON_UP, EDGE_RELEASED, game.move_selector_up)
+    input_router.on(STATE_TIC_TAC_TOE, BUTTON_DOWN, EDGE_RELEASED, game.move_selector_down)
+    input_router.on(STATE_TIC_TAC_TOE, BUTTON_A, EDGE_RELEASED, game.move_selector_left)
+    input_router.on(STATE_TIC_TAC_TOE, BUTTON_C, EDGE_RELEASED, game.move_selector_right)
+    input_router.on(STATE_TIC_TAC_TOE, BUTTON_B, EDGE_RELEASED, play_selected_cell)
+
+    # any button starts a new game, UP switches to the next game mode first
+    input_router.on_any(STATE_TIC_TAC_TOE_GAMEOVER, EDGE_RELEASED, new_game)
+    input_router.on(STATE_TIC_TAC_TOE_GAMEOVER, BUTTON_UP, EDGE_RELEASED, next_mode_new_game)
+
+
+def network_playing():
+    return link is not None and link.active
+
+
+def start_network_play():
+    """
+    Play tic-tac-toe against the badge at BADGE_PEER, the game starts once the badges are paired.
+    """
+    global CURRENT_STATE
+    if link is None:
+        print("Set BADGE_PEER in settings.toml to play another badge.")
+        return
+    print("B held and C pressed")
+    if game is None:
+        build_game()
+    game.reset_game()
+    link.start()
+    mode_text.text = "network: pairing"
+    CURRENT_STATE = STATE_TIC_TAC_TOE
+    update_score_text()
+    set_state(CURRENT_STATE)
+
+
+def start_network_round(first_piece):
+    """
+    Called by the badge link when a game against the other badge starts.
+    """
+    global CURRENT_STATE
+    game.reset_game()
+    game.turn = first_piece
+    track_game_memory(new_game=True)
+    mode_text.text = f"network: you are {link.local_piece}"
+    CURRENT_STATE = STATE_TIC_TAC_TOE
+    refresher.request()
+
+
+def network_lost(stopped):
+    """
+    Called by the badge link when the other badge stops answering.
+    """
+    mode_text.text = "network: no answer" if stopped else "network: pairing"
+    refresher.request()
+
+
+def play_remote_move(cell):
+    """
+    Called by the badge link with the other badge's move. Returns False if it can not be played here.
+    """
+    if CURRENT_STATE != STATE_TIC_TAC_TOE or game.turn == link.local_piece or not game.bitboard.is_empty(cell):
+        return False
+    game.play_piece_at(game.turn, (cell % 3, cell // 3), refresh=True)
+    game.turn = link.local_piece
+    empty_count = game.bitboard.empty_count
+    if game.selector_cell == cell and empty_count > 0:
+        # move the selector off the new piece, like after a move on this badge
+        empty_idx = game.bitboard.nth_empty(random.randint(0, empty_count - 1))
+        game.selector_position[0] = empty_idx % 3
+        game.selector_position[1] = empty_idx // 3
+        game.place_selector(refresh=True)
+    finish_move()
+    return True
+
+
+# tic-tac-toe against another badge over UDP, both badges need the other one's address in
+# settings.toml as BADGE_PEER. See badge_link.py for the protocol.
+BADGE_PEER = os.getenv("BADGE_PEER")
+BADGE_LINK_PORT = int(os.getenv("BADGE_LINK_PORT", DEFAULT_PORT))
+link = None
+if BADGE_PEER:
+    link = BadgeLink(pool, (BADGE_PEER, BADGE_LINK_PORT), lambda: game.bitboard, play_remote_move,
+                     start_network_round, port=BADGE_LINK_PORT, on_lost=network_lost)
+
+
+def start_tic_tac_toe():
+    global CURRENT_STATE
+    if LAST_STATE_CHANGE + CHANGE_STATE_BTN_COOLDOWN >= time.monotonic():
+        # too soon after leaving the game, treat it as a plain C press
+        change_brightness()
+        return
+    print("A held and C pressed")
+    if game is None:
+        started = time.monotonic()
+        build_game()
+        print(f"game built in {(time.monotonic() - started) * 1000:.0f}ms")
+    CURRENT_STATE = STATE_TIC_TAC_TOE
+    update_score_text()
+    set_state(CURRENT_STATE)
+    track_game_memory(new_game=True)
+    play_badge_move()
+
+
+# button handlers for each state, key and edge. Every queued event is handled each tick.
+# The tic-tac-toe handlers are added by build_game().
+input_router = InputRouter(buttons.events, 3, 5, lambda: CURRENT_STATE)
+
+input_router.on_chord(STATE_BADGE, (BUTTON_A,), BUTTON_C, EDGE_RELEASED, start_tic_tac_toe)
+input_router.on_chord(STATE_BADGE, (BUTTON_B,), BUTTON_C, EDGE_RELEASED, start_network_play)
+input_router.on(STATE_BADGE, BUTTON_UP, EDGE_RELEASED, print_stats_next_animation)
+input_router.on(STATE_BADGE, BUTTON_DOWN, EDGE_RELEASED, previous_animation)
+input_router.on(STATE_BADGE, BUTTON_B, EDGE_RELEASED, lights_off)
+input_router.on(STATE_BADGE, BUTTON_C, EDGE_RELEASED, change_brightness)
+
+
+def update_leds():
+    if CURRENT_STATE == STATE_TIC_TAC_TOE:
+        animations.freeze()
+        animations.fill(BLACK)
+    elif CURRENT_STATE == STATE_BADGE:
+        if not animations.animate() and animations.paused:
+            # static colors, only written when they or the brightness changed
+            leds.show()
+
+
+# each part of the main loop runs as its own task: name, step function, interval and time budget in seconds
+runtime = BadgeRuntime()
+runtime.add_task("http", metrics.timed("server.poll", server.poll), interval=0.01, budget=0.05)
+runtime.add_task("buttons", metrics.timed("events", input_router.poll), interval=0.01, budget=0.02)
+runtime.add_task("leds", metrics.timed("animations.animate", update_leds), interval=0.02, budget=0.01)
+# push out any pending display changes once the panel is ready for them
+runtime.add_task("display", metrics.timed("display.refresh", refresher.poll), interval=0.1, budget=0.1)
+# write debounced score journal records
+runtime.add_task("nvm", metrics.timed("nvm.save", score_journal.poll), interval=1, budget=0.1)
+# append finished games to the game log
+runtime.add_task("game log", metrics.timed("game_log.flush", game_log.poll), interval=1, budget=0.1)
+# push score changes to server-sent events clients
+runtime.add_task("score stream", score_stream.poll, interval=0.25, budget=0.05)
+if link is not None:
+    # moves, acks and retransmits for games against another badge
+    runtime.add_task("badge link", metrics.timed("link.poll", link.poll), interval=0.01, budget=0.01)
+
+if METRICS_ENABLED:
+    runtime.add_task("memory", metrics.sample_memory, interval=1, budget=0.01)
+    metrics.add_counter("badge_refresh_requested", refresher, "requested")
+    metrics.add_counter("badge_refresh_merged", refresher, "merged")
+    metrics.add_counter("badge_refresh_deferred", refresher, "deferred")
+    metrics.add_counter("badge_refresh_done", refresher, "refreshes")
+    metrics.add_counter("badge_refresh_runtime_errors", refresher, "errors")
+    metrics.add_counter("badge_nvm_commits", score_journal, "commits")
+    metrics.add_counter("badge_games_logged", game_log, "games_added")
+    metrics.add_counter("badge_game_log_writes", game_log, "writes")
+    metrics.add_counter("badge_index_renders", index_cache, "renders")
+    metrics.add_counter("badge_index_not_modified", index_cache, "not_modified")
+    metrics.add_counter("badge_static_served", static_files, "served")
+    metrics.add_counter("badge_static_gzip_served", static_files, "gzip_served")
+    metrics.add_counter("badge_static_not_modified", static_files, "not_modified")
+    metrics.add_counter("badge_led_batches", led_batch, "batches")
+    metrics.add_counter("badge_led_frames_shown", animations, "frames_shown")
+    metrics.add_counter("badge_led_frames_skipped", animations, "frames_skipped")
+    metrics.add_counter("badge_input_events", input_router, "events_handled")
+    metrics.add_counter("badge_input_latency_max_ms", input_router, "latency_max_ms")
+    metrics.add_counter("badge_led_writes", leds, "writes")
+    metrics.add_counter("badge_led_writes_suppressed", leds, "suppressed")
+    metrics.add_counter("badge_score_events_sent", score_stream, "events_sent")
+    if link is not None:
+        metrics.add_counter("badge_link_retransmits", link, "retransmits")
+        metrics.add_counter("badge_link_rtt_max_ms", link, "rtt_max")
+        metrics.add_counter("badge_link_timeouts", link, "timeouts")
+        metrics.add_counter("badge_link_desyncs", link, "desyncs")
+
+    @server.route("/metrics", GET)
+    def metrics_handler(request: Request):
+        return Response(request, metrics.render(), content_type="text/plain")
+
+boot_trace.mark("ready")
+print(boot_trace.report())
+runtime.run()
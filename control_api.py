@@ -0,0 +1,227 @@
+"""
+Compact remote control API for the badge LEDs and a server-sent events stream of the scores.
+
+POST /api/leds applies a batch of LED operations in one request. Pixel and fill colors are
+written to the strip with a single show() at the end of the batch; a batch without them, such as
+a brightness change or an animation command, leaves the strip for the animation to draw next. The body is either JSON, a list of operations:
+
+    [["pixel", 0, "#ff0000"], ["fill", 255], ["brightness", 0.4], ["animation", "next"]]
+
+or, with Content-Type: application/octet-stream, packed binary operations:
+
+    0x01 index r g b     set one pixel
+    0x02 r g b           fill all pixels
+    0x03 level           brightness, level / 255
+    0x04 command         animation command, index into ANIMATION_COMMANDS
+    0x05 index           activate the animation at index
+
+Animation commands are "next", "previous", "freeze" and "resume". Setting pixel colors freezes
+the running animation so it does not paint over them; "resume" hands the LEDs back to it.
+"""
+import json
+import time
+
+OP_PIXEL = 0x01
+OP_FILL = 0x02
+OP_BRIGHTNESS = 0x03
+OP_ANIMATION = 0x04
+OP_ACTIVATE = 0x05
+
+ANIMATION_COMMANDS = ("next", "previous", "freeze", "resume")
+
+# bytes taken by each binary operation, including the opcode
+BINARY_OP_SIZES = {
+    OP_PIXEL: 5,
+    OP_FILL: 4,
+    OP_BRIGHTNESS: 2,
+    OP_ANIMATION: 2,
+    OP_ACTIVATE: 2,
+}
+
+
+def parse_color(color):
+    """
+    accepts an int, a "#rrggbb" / "0xrrggbb" string or an [r, g, b] list and returns an int color
+    """
+    if isinstance(color, int):
+        return color
+    if isinstance(color, str):
+        return int(color.replace("#", "").replace("0x", ""), 16)
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+def run_animation_command(animations, command):
+    if command == "next":
+        animations.resume()
+        animations.next()
+    elif command == "previous":
+        animations.resume()
+        animations.previous()
+    elif command == "freeze":
+        animations.freeze()
+    elif command == "resume":
+        animations.resume()
+    else:
+        raise ValueError(f"unknown animation command: {command}")
+
+
+class LedBatch:
+    """
+    Applies batches of LED operations to the pixels and animation sequence.
+    """
+
+    def __init__(self, pixels, animations):
+        self.pixels = pixels
+        self.animations = animations
+        # set when a batch sets pixel or fill colors, which need a show() at its end
+        self._colors_set = False
+
+        # counters
+        self.batches = 0
+        self.operations = 0
+
+    def apply_json(self, operations):
+        """
+        apply a list of JSON operations, returns how many were applied
+        """
+        auto_write = self._begin()
+        try:
+            for operation in operations:
+                name = operation[0]
+                if name == "pixel":
+                    self._set_pixel(operation[1], parse_color(operation[2]))
+                elif name == "fill":
+                    self._fill(parse_color(operation[1]))
+                elif name == "brightness":
+                    self.pixels.brightness = min(max(float(operation[1]), 0.0), 1.0)
+                elif name == "animation":
+                    if isinstance(operation[1], int):
+                        self.animations.activate(operation[1])
+                    else:
+                        run_animation_command(self.animations, operation[1])
+                else:
+                    raise ValueError(f"unknown operation: {name}")
+        finally:
+            self._end(auto_write)
+        return self._count(len(operations))
+
+    def apply_binary(self, data):
+        """
+        apply packed binary operations, returns how many were applied
+        """
+        auto_write = self._begin()
+        count = 0
+        offset = 0
+        try:
+            while offset < len(data):
+                opcode = data[offset]
+                size = BINARY_OP_SIZES.get(opcode)
+                if size is None or offset + size > len(data):
+                    raise ValueError(f"bad operation at byte {offset}")
+                if opcode == OP_PIXEL:
+                    color = (data[offset + 2] << 16) | (data[offset + 3] << 8) | data[offset + 4]
+                    self._set_pixel(data[offset + 1], color)
+                elif opcode == OP_FILL:
+                    self._fill((data[offset + 1] << 16) | (data[offset + 2] << 8) | data[offset + 3])
+                elif opcode == OP_BRIGHTNESS:
+                    self.pixels.brightness = data[offset + 1] / 255
+                elif opcode == OP_ANIMATION:
+                    run_animation_command(self.animations, ANIMATION_COMMANDS[data[offset + 1]])
+                else:  # OP_ACTIVATE
+                    self.animations.activate(data[offset + 1])
+                offset += size
+                count += 1
+        finally:
+            self._end(auto_write)
+        return self._count(count)
+
+    def _begin(self):
+        # hold back writes to the strip until the whole batch has been applied
+        auto_write = self.pixels.auto_write
+        self.pixels.auto_write = False
+        self._colors_set = False
+        return auto_write
+
+    def _end(self, auto_write):
+        # showing the stored colors during an animation would flash them until its next frame
+        if self._colors_set:
+            self.pixels.show()
+        self.pixels.auto_write = auto_write
+
+    def _count(self, count):
+        self.batches += 1
+        self.operations += count
+        return count
+
+    def _set_pixel(self, index, color):
+        self.animations.freeze()
+        self.pixels[index] = color
+        self._colors_set = True
+
+    def _fill(self, color):
+        self.animations.freeze()
+        self.pixels.fill(color)
+        self._colors_set = True
+
+
+class ScoreStream:
+    """
+    Pushes the session and all time scores to server-sent events clients when they change.
+
+    Handlers add() each new SSEResponse and call changed() when a score changes. poll() is run
+    from the main loop and does the sending, after the response headers have gone out.
+    """
+
+    def __init__(self, session_score, all_time_score, max_clients=2, keepalive_interval=15):
+        self.session_score = session_score
+        self.all_time_score = all_time_score
+        # every stream holds a socket open, and the badge only has a few of them
+        self.max_clients = max_clients
+        self.keepalive_interval = keepalive_interval
+
+        self.clients = []
+        self._changed = False
+        self._new_clients = False
+        self._last_send = 0
+
+        # counters
+        self.events_sent = 0
+
+    def add(self, response):
+        self.clients.append(response)
+        if len(self.clients) > self.max_clients:
+            self._close(self.clients[0])
+        self._new_clients = True
+
+    def changed(self):
+        self._changed = True
+
+    def poll(self):
+        if not self.clients:
+            self._changed = False
+            return
+        now = time.monotonic()
+        if self._changed or self._new_clients:
+            data = json.dumps({"session": self.session_score, "all": self.all_time_score})
+            self._send(data, "scores", now)
+            self._changed = False
+            self._new_clients = False
+        elif now - self._last_send >= self.keepalive_interval:
+            # lets clients notice a dead badge, and us notice dead clients
+            self._send("", "ping", now)
+
+    def _send(self, data, event, now):
+        self._last_send = now
+        for client in self.clients[:]:
+            try:
+                client.send_event(data, event=event)
+                self.events_sent += 1
+            except OSError:
+                self._close(client)
+
+    def _close(self, client):
+        self.clients.remove(client)
+        try:
+            client.close()
+        except OSError:
+            pass
@@ -0,0 +1,313 @@
+"""
+Binary log of every finished tic-tac-toe game, with statistics kept up to date as games end.
+
+Games are appended to games.bin in the log directory, sd/ on the badge. Every record is
+2 to 6 bytes:
+    0     bits 0-1 result, RESULT_X_WINS, RESULT_O_WINS or RESULT_DRAW
+          bit 2 first player, 0 for X and 1 for O
+          bits 3-4 game mode, the index into GAME_MODE_NAMES in code.py
+          bits 5-7 RECORD_MARKER
+    1-5   4 bit fields, high nibble first: the number of moves, then the cell index of each
+          move in the order they were played, padded with 0xf to a whole byte
+
+Records are buffered in RAM and appended in one write once flush_delay seconds have passed
+since the first buffered game, or when the buffer is full.
+
+The statistics are not worked out from the log. They are updated as each game is added and
+saved to stats.bin along with how many bytes of the log they cover. At startup only the part of
+the log written after the last saved statistics is replayed, which is nothing unless the badge
+lost power between the two writes. Replay skips bytes that do not start a valid record, such as
+a record cut short by a power loss.
+
+CIRCUITPY is read only to code.py unless an SD card is mounted at /sd, or B was held at reset
+so boot.py remounted it writable. When the log can not be written the statistics are still kept
+in RAM until the next reset.
+"""
+import os
+import struct
+import time
+
+LOG_DIRECTORY = "sd"
+LOG_FILE = "games.bin"
+STATS_FILE = "stats.bin"
+
+RESULT_X_WINS = 0
+RESULT_O_WINS = 1
+RESULT_DRAW = 2
+RESULT_NAMES = ("X", "O", "draw")
+
+RECORD_MARKER = 0b101
+MAX_RECORD_SIZE = 6
+# game modes a record can hold
+MODE_COUNT = 4
+
+STATS_MAGIC = b"TTTs"
+# magic, log bytes covered, games, moves, first player wins, then games by result,
+# games by opening cell and games by mode and result
+STATS_FORMAT = "<4sIIII3I9I12I"
+STATS_SIZE = struct.calcsize(STATS_FORMAT)
+
+
+def record_size(move_count):
+    return 1 + (move_count + 2) // 2
+
+
+def _nibble(moves, move_count, nibble):
+    if nibble == 0:
+        return move_count
+    if nibble <= move_count:
+        return moves[nibble - 1]
+    return 0x0f
+
+
+def encode_record(buffer, offset, first_player, moves, move_count, result, mode):
+    """
+    write the record of one game into buffer at offset, returns the record size
+    """
+    buffer[offset] = RECORD_MARKER << 5 | mode << 3 | (first_player == "O") << 2 | result
+    size = record_size(move_count)
+    # nibble 0 is the move count, nibble n is move n - 1
+    for index in range(1, size):
+        nibble = (index - 1) * 2
+        buffer[offset + index] = _nibble(moves, move_count, nibble) << 4 | _nibble(moves, move_count, nibble + 1)
+    return size
+
+
+def decode_record(data, offset, end, moves):
+    """
+    Read the record at offset into moves. Returns (size, header byte), (0, 0) if the record
+    does not fit before end, or (-1, 0) if no valid record starts at offset.
+    """
+    if offset + 2 > end:
+        return 0, 0
+    header = data[offset]
+    if header >> 5 != RECORD_MARKER or header & 0b11 > RESULT_DRAW:
+        return -1, 0
+    move_count = data[offset + 1] >> 4
+    if move_count == 0 or move_count > 9:
+        return -1, 0
+    size = record_size(move_count)
+    if offset + size > end:
+        return 0, 0
+    played = 0
+    for move in range(move_count):
+        nibble = move + 1
+        byte = data[offset + 1 + nibble // 2]
+        cell = byte & 0x0f if nibble % 2 else byte >> 4
+        if cell > 8 or played & (1 << cell):
+            return -1, 0
+        played |= 1 << cell
+        moves[move] = cell
+    if move_count % 2 == 0 and data[offset + size - 1] & 0x0f != 0x0f:
+        return -1, 0
+    return size, header
+
+
+class GameStats:
+    """
+    Totals over every logged game, updated one game at a time.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.log_size = 0
+        self.games = 0
+        self.moves = 0
+        self.first_player_wins = 0
+        self.results = [0] * 3
+        self.openings = [0] * 9
+        self.mode_results = [0] * (MODE_COUNT * 3)
+
+    def add(self, first_o, moves, move_count, result, mode):
+        self.games += 1
+        self.moves += move_count
+        self.results[result] += 1
+        self.openings[moves[0]] += 1
+        self.mode_results[mode * 3 + result] += 1
+        if result == (RESULT_O_WINS if first_o else RESULT_X_WINS):
+            self.first_player_wins += 1
+
+    def pack(self):
+        return struct.pack(STATS_FORMAT, STATS_MAGIC, self.log_size, self.games, self.moves, self.first_player_wins,
+                           *self.results, *self.openings, *self.mode_results)
+
+    def unpack(self, data):
+        """
+        Load packed statistics. Returns False, leaving the statistics reset, if data is not valid.
+        """
+        self.reset()
+        if len(data) != STATS_SIZE:
+            return False
+        values = struct.unpack(STATS_FORMAT, data)
+        if values[0] != STATS_MAGIC:
+            return False
+        self.log_size, self.games, self.moves, self.first_player_wins = values[1:5]
+        self.results = list(values[5:8])
+        self.openings = list(values[8:17])
+        self.mode_results = list(values[17:])
+        return True
+
+    def as_dict(self, mode_names):
+        decided = self.results[RESULT_X_WINS] + self.results[RESULT_O_WINS]
+        return {
+            "games": self.games,
+            "results": {name: self.results[result] for result, name in enumerate(RESULT_NAMES)},
+            "first_player_wins": self.first_player_wins,
+            "first_player_win_rate": self.first_player_wins / decided if decided else 0,
+            "average_moves": self.moves / self.games if self.games else 0,
+            # times each cell was played first, indexed like the bitboard
+            "openings": self.openings,
+            "modes": {name: {result_name: self.mode_results[mode * 3 + result]
+                             for result, result_name in enumerate(RESULT_NAMES)}
+                      for mode, name in enumerate(mode_names)},
+        }
+
+
+class GameLog:
+    """
+    Appends finished games to the log file and keeps GameStats for them.
+    """
+
+    def __init__(self, directory=None, buffer_size=64, flush_delay=30):
+        directory = directory if directory is not None else LOG_DIRECTORY
+        self.log_path = f"{directory}/{LOG_FILE}"
+        self.stats_path = f"{directory}/{STATS_FILE}"
+        # seconds to wait after a game before writing it, so games close together become one write
+        self.flush_delay = flush_delay
+
+        self.stats = GameStats()
+        self.writable = True
+
+        self._pending = bytearray(buffer_size)
+        self._pending_length = 0
+        self.pending_since = None
+        self._moves = bytearray(9)
+
+        # counters
+        self.games_added = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.games_dropped = 0
+        self.replayed_games = 0
+        self.skipped_bytes = 0
+
+    def log_size(self):
+        try:
+            return os.stat(self.log_path)[6]
+        except OSError:
+            return 0
+
+    def load(self, read_buffer_size=256):
+        """
+        Load the saved statistics and replay any part of the log they do not cover yet.
+        """
+        try:
+            with open(self.stats_path, "rb") as f:
+                self.stats.unpack(f.read())
+        except OSError:
+            self.stats.reset()
+
+        log_size = self.log_size()
+        if log_size < self.stats.log_size:
+            # the log was replaced or removed, count it again from the start
+            self.stats.reset()
+        if log_size == self.stats.log_size:
+            return
+
+        buffer = bytearray(read_buffer_size)
+        offset = self.stats.log_size
+        with open(self.log_path, "rb") as f:
+            while offset < log_size:
+                f.seek(offset)
+                count = f.readinto(buffer)
+                position = 0
+                while position < count:
+                    size, header = decode_record(buffer, position, count, self._moves)
+                    if size == 0:
+                        break
+                    if size < 0:
+                        position += 1
+                        self.skipped_bytes += 1
+                        continue
+                    self.stats.add(header & 0b100, self._moves, buffer[position + 1] >> 4, header & 0b11,
+                                   (header >> 3) & 0b11)
+                    self.replayed_games += 1
+                    position += size
+                if position == 0:
+                    # a record cut short at the end of the log
+                    self.skipped_bytes += log_size - offset
+                    break
+                offset += position
+        self.stats.log_size = log_size
+        try:
+            self._save_stats()
+        except OSError:
+            self.writable = False
+
+    def add_game(self, first_player, moves, move_count, result, mode):
+        """
+        Log a finished game. moves holds the cell index of each move in the order they were played.
+        """
+        if self._pending_length + MAX_RECORD_SIZE > len(self._pending):
+            self.flush()
+        self._pending_length += encode_record(self._pending, self._pending_length, first_player, moves, move_count,
+                                              result, mode)
+        self.stats.add(first_player == "O", moves, move_count, result, mode)
+        self.games_added += 1
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+
+    @property
+    def pending(self):
+        return self.pending_since is not None
+
+    def poll(self):
+        """
+        Write buffered games if they have waited flush_delay seconds. Returns True if the log was written.
+        """
+        if self.pending_since is None or time.monotonic() - self.pending_since < self.flush_delay:
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        """
+        Append buffered games to the log right away, then save the statistics.
+        """
+        if self.pending_since is None:
+            return
+        if self.writable:
+            try:
+                with open(self.log_path, "ab") as f:
+                    f.write(memoryview(self._pending)[:self._pending_length])
+                self.stats.log_size += self._pending_length
+                self._save_stats()
+                self.writes += 1
+            except OSError as error:
+                # usually a read only filesystem, keep counting games in RAM only
+                print(f"game log not written: {error}")
+                self.writable = False
+                self.write_errors += 1
+        if not self.writable:
+            self.games_dropped += self._count_pending()
+        self._pending_length = 0
+        self.pending_since = None
+
+    def _count_pending(self):
+        games = 0
+        position = 0
+        while position < self._pending_length:
+            position += record_size(self._pending[position + 1] >> 4)
+            games += 1
+        return games
+
+    def _save_stats(self):
+        with open(self.stats_path, "wb") as f:
+            f.write(self.stats.pack())
+
+    def report(self):
+        return (f"game log games: {self.stats.games} added: {self.games_added} writes: {self.writes} "
+                f"log: {self.stats.log_size} bytes replayed: {self.replayed_games} skipped: {self.skipped_bytes} "
+                f"dropped: {self.games_dropped}")
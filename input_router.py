@@ -0,0 +1,119 @@
+"""
+Table driven button handling.
+
+Every poll() drains all queued keypad events into one reused Event, keeps the held keys as a
+bitmask and looks the handler up in a flat state x key x edge table. Chords such as holding A
+while pressing C are checked against precomputed masks before the single key handlers, and once
+a chord fires the releases of its keys that are still held are swallowed so they do not also act
+as single presses.
+
+Handling a whole burst in one poll() also means every display change it makes is requested before
+the refresh scheduler next runs, so the burst ends up as one refresh.
+"""
+import keypad
+
+from metrics import ticks_ms, ticks_diff
+
+EDGE_PRESSED = 0
+EDGE_RELEASED = 1
+
+
+def key_mask(*keys):
+    """
+    returns the bitmask with the bits of keys set
+    """
+    mask = 0
+    for key in keys:
+        mask |= 1 << key
+    return mask
+
+
+class InputRouter:
+    """
+    Dispatches keypad events to handlers registered per state, key and edge.
+    """
+
+    def __init__(self, events, state_count, key_count, get_state):
+        self.events = events
+        self.key_count = key_count
+        # returns the current state, read again for every event since handlers change it
+        self.get_state = get_state
+
+        # handlers[(state * key_count + key) * 2 + edge]
+        self.handlers = [None] * (state_count * key_count * 2)
+        # chords[state] is a list of (mask, key, edge, handler)
+        self.chords = [[] for _ in range(state_count)]
+
+        self.held = 0
+        # held keys that were part of a chord, their release is ignored
+        self.consumed = 0
+        self._event = keypad.Event()
+
+        # counters
+        self.events_handled = 0
+        self.chords_fired = 0
+        self.polls_with_events = 0
+        self.max_events_per_poll = 0
+        self.latency_max_ms = 0
+
+    def on(self, state, key, edge, handler):
+        self.handlers[(state * self.key_count + key) * 2 + edge] = handler
+
+    def on_any(self, state, edge, handler):
+        for key in range(self.key_count):
+            self.on(state, key, edge, handler)
+
+    def on_chord(self, state, held_keys, key, edge, handler):
+        """
+        call handler when key has edge while all of held_keys are down
+        """
+        self.chords[state].append((key_mask(key, *held_keys), key, edge, handler))
+
+    def poll(self):
+        """
+        handle every queued event, returns how many were handled
+        """
+        count = 0
+        event = self._event
+        while self.events.get_into(event):
+            self.handle(event.key_number, EDGE_PRESSED if event.pressed else EDGE_RELEASED)
+            count += 1
+            if event.timestamp is not None:
+                latency = ticks_diff(ticks_ms(), event.timestamp)
+                if latency > self.latency_max_ms:
+                    self.latency_max_ms = latency
+
+        if count:
+            self.events_handled += count
+            self.polls_with_events += 1
+            if count > self.max_events_per_poll:
+                self.max_events_per_poll = count
+        return count
+
+    def handle(self, key, edge):
+        bit = 1 << key
+        if edge == EDGE_PRESSED:
+            self.held |= bit
+            held = self.held
+        else:
+            held = self.held
+            self.held &= ~bit
+            if self.consumed & bit:
+                self.consumed &= ~bit
+                return
+
+        state = self.get_state()
+        for mask, chord_key, chord_edge, handler in self.chords[state]:
+            if chord_key == key and chord_edge == edge and held & mask == mask:
+                self.chords_fired += 1
+                self.consumed |= self.held & mask
+                handler()
+                return
+
+        handler = self.handlers[(state * self.key_count + key) * 2 + edge]
+        if handler is not None:
+            handler()
+
+    def report(self):
+        return (f"input events: {self.events_handled} chords: {self.chords_fired} "
+                f"max per poll: {self.max_events_per_poll} max latency: {self.latency_max_ms}ms")
@@ -0,0 +1,95 @@
+"""
+The one place that writes to the NeoPixel strip.
+
+Keeps a copy of the last bytes pushed to the strip and only writes when a new frame differs from
+it, so code that keeps filling the same color every loop costs a buffer compare instead of a
+strip update. Brightness is applied when colors are encoded, so a brightness change shows up as
+changed bytes like any other change.
+"""
+from neopixel_write import neopixel_write
+
+
+class LedOutput:
+    """
+    Static pixel colors plus dirty tracked writes of them or of any other frame buffer.
+    Has the parts of the NeoPixel API LedBatch uses, with auto_write always off.
+    """
+
+    auto_write = False
+
+    def __init__(self, pixels, brightness=1.0):
+        self.pin = pixels.pin
+        self.pixel_count = len(pixels)
+        self.byteorder = getattr(pixels, "byteorder", "GRB")
+        self.bpp = len(self.byteorder)
+
+        # static colors as 0xRRGGBB, and the same colors encoded for the strip
+        self.colors = [0] * self.pixel_count
+        self.frame = bytearray(self.pixel_count * self.bpp)
+        self._brightness = brightness
+
+        self._last = bytearray(self.pixel_count * self.bpp)
+        self._pushed = False
+
+        # counters
+        self.writes = 0
+        self.suppressed = 0
+
+    def __len__(self):
+        return self.pixel_count
+
+    def encode(self, color, buf, offset):
+        """
+        write color in the strip's byte order with brightness applied into buf at offset
+        """
+        for channel_idx, channel in enumerate(self.byteorder):
+            if channel == "R":
+                value = (color >> 16) & 0xff
+            elif channel == "G":
+                value = (color >> 8) & 0xff
+            elif channel == "B":
+                value = color & 0xff
+            else:  # white channel
+                value = 0
+            buf[offset + channel_idx] = int(value * self._brightness)
+
+    def __setitem__(self, index, color):
+        if isinstance(color, tuple):
+            color = (color[0] << 16) | (color[1] << 8) | color[2]
+        self.colors[index] = color
+        self.encode(color, self.frame, (index % self.pixel_count) * self.bpp)
+
+    def fill(self, color):
+        if isinstance(color, tuple):
+            color = (color[0] << 16) | (color[1] << 8) | color[2]
+        for index in range(self.pixel_count):
+            self.colors[index] = color
+            self.encode(color, self.frame, index * self.bpp)
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, brightness):
+        brightness = min(max(brightness, 0.0), 1.0)
+        if brightness != self._brightness:
+            self._brightness = brightness
+            for index, color in enumerate(self.colors):
+                self.encode(color, self.frame, index * self.bpp)
+
+    def show(self, buf=None):
+        """
+        push buf, or the static colors, to the strip unless it is what the strip already shows.
+        Returns True if the strip was written.
+        """
+        if buf is None:
+            buf = self.frame
+        if self._pushed and buf == self._last:
+            self.suppressed += 1
+            return False
+        self._last[:] = buf
+        self._pushed = True
+        neopixel_write(self.pin, buf)
+        self.writes += 1
+        return True
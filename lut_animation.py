@@ -0,0 +1,236 @@
+"""
+Lookup table LED animations.
+
+Each effect's whole color cycle is computed once into a bytearray, already in the strip's byte
+order and with brightness applied. Showing a frame is then a single LedOutput.show() of a
+memoryview into that table, with no per pixel color math. The frame to show is picked from the
+time since the effect started, so when something else holds up the main loop frames are skipped
+instead of the animation slowing down.
+
+After a brightness change the tables are rebuilt one effect per animate() call, the current effect
+first, so a change never recomputes every frame of every effect in one step.
+"""
+import random
+
+from metrics import ticks_ms, ticks_diff
+
+
+def colorwheel(pos):
+    """
+    returns the 0xRRGGBB color at position 0-255 of a red, green, blue color wheel
+    """
+    pos = int(pos) % 256
+    if pos < 85:
+        return (255 - pos * 3) << 16 | (pos * 3) << 8
+    if pos < 170:
+        pos -= 85
+        return (pos * 3) << 8 | (255 - pos * 3)
+    pos -= 170
+    return (pos * 3) << 16 | (255 - pos * 3)
+
+
+def _scale(color, factor):
+    return (int(((color >> 16) & 0xff) * factor) << 16 | int(((color >> 8) & 0xff) * factor) << 8
+            | int((color & 0xff) * factor))
+
+
+class LutEffect:
+    """
+    An effect described by a function that returns the pixel colors of a frame.
+    Only used while building the tables.
+    """
+
+    def __init__(self, name, frame_time, frame_count, frame_colors):
+        self.name = name
+        # seconds each frame is shown
+        self.frame_time = frame_time
+        self.frame_count = frame_count
+        # frame_colors(frame_index, pixel_count) returns a list of 0xRRGGBB colors
+        self.frame_colors = frame_colors
+
+
+def rainbow(speed=0.1, period=2):
+    frame_count = max(1, int(period / speed))
+
+    def frame_colors(frame, pixel_count):
+        return [colorwheel(frame * 256 / frame_count + i * 256 / pixel_count) for i in range(pixel_count)]
+
+    return LutEffect("rainbow", speed, frame_count, frame_colors)
+
+
+def rainbow_comet(pixel_count, speed=0.1, tail_length=10, bounce=False):
+    span = pixel_count + tail_length
+    frame_count = span * 2 if bounce else span
+
+    def frame_colors(frame, pixel_count):
+        head = frame if frame < span else frame_count - frame
+        colors = []
+        for i in range(pixel_count):
+            distance = head - i
+            if 0 <= distance < tail_length:
+                # bright head fading out along the tail
+                colors.append(_scale(colorwheel(distance * 256 // tail_length), 1 - distance / tail_length))
+            else:
+                colors.append(0)
+        return colors
+
+    return LutEffect("rainbow_comet", speed, frame_count, frame_colors)
+
+
+def rainbow_sparkle(speed=0.1, period=2, num_sparkles=1, background_brightness=0.2):
+    # two rainbow cycles worth of sparkles, so the repeat is hard to spot
+    frame_count = max(1, int(period / speed)) * 2
+    rng = random.Random(2024) if hasattr(random, "Random") else random
+
+    def frame_colors(frame, pixel_count):
+        colors = [_scale(colorwheel(frame * 512 / frame_count + i * 256 / pixel_count), background_brightness)
+                  for i in range(pixel_count)]
+        for _ in range(num_sparkles):
+            pixel = rng.randint(0, pixel_count - 1)
+            colors[pixel] = colorwheel(frame * 512 / frame_count + pixel * 256 / pixel_count)
+        return colors
+
+    return LutEffect("rainbow_sparkle", speed, frame_count, frame_colors)
+
+
+def rainbow_chase(speed=0.1, size=2, spacing=3, step=8):
+    pattern = size + spacing
+    # the pattern and the color cycle both repeat within 256 / step frames when step divides 256
+    frame_count = max(pattern, 256 // step)
+
+    def frame_colors(frame, pixel_count):
+        colors = []
+        for i in range(pixel_count):
+            if (i + frame) % pattern < size:
+                colors.append(colorwheel(frame * step + i * step))
+            else:
+                colors.append(0)
+        return colors
+
+    return LutEffect("rainbow_chase", speed, frame_count, frame_colors)
+
+
+class LutAnimationSequence:
+    """
+    Plays precomputed effects through a LedOutput. Has the parts of the AnimationSequence API the
+    badge uses: animate(), next(), previous(), activate(), freeze(), resume() and fill().
+    """
+
+    def __init__(self, output, *effects, advance_interval=None):
+        self.output = output
+        self.pixel_count = len(output)
+        self.effects = effects
+        self.advance_interval_ms = int(advance_interval * 1000) if advance_interval else None
+
+        self.current = 0
+        self.paused = False
+        self._start = ticks_ms()
+        self._last_frame = -1
+
+        # counters
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+        # one table per effect and the frame views into it
+        frame_size = self.pixel_count * output.bpp
+        self._tables = []
+        self._frames = []
+        for effect in effects:
+            table = bytearray(effect.frame_count * frame_size)
+            view = memoryview(table)
+            self._tables.append(table)
+            self._frames.append([view[frame * frame_size:(frame + 1) * frame_size]
+                                 for frame in range(effect.frame_count)])
+        # brightness each table was computed with
+        self._table_brightness = [None] * len(effects)
+        for index in range(len(effects)):
+            self._build(index)
+
+    def _build(self, index):
+        """
+        compute every frame of one effect at the output's current brightness, in place
+        """
+        bpp = self.output.bpp
+        frame_size = self.pixel_count * bpp
+        effect = self.effects[index]
+        table = self._tables[index]
+        for frame in range(effect.frame_count):
+            for pixel, color in enumerate(effect.frame_colors(frame, self.pixel_count)):
+                self.output.encode(color, table, frame * frame_size + pixel * bpp)
+        self._table_brightness[index] = self.output.brightness
+        if index == self.current:
+            self._last_frame = -1
+
+    def _update_tables(self):
+        """
+        rebuild at most one table that is out of date with the output's brightness, the current one first
+        """
+        brightness = self.output.brightness
+        if self._table_brightness[self.current] != brightness:
+            self._build(self.current)
+            return
+        for index, table_brightness in enumerate(self._table_brightness):
+            if table_brightness != brightness:
+                self._build(index)
+                return
+
+    @property
+    def brightness(self):
+        return self.output.brightness
+
+    @brightness.setter
+    def brightness(self, brightness):
+        # the tables catch up from animate()
+        self.output.brightness = brightness
+
+    @property
+    def table_size(self):
+        return sum(len(table) for table in self._tables)
+
+    def animate(self):
+        """
+        show the frame that is due for the current effect. Returns True if a frame was written.
+        """
+        if self.paused:
+            return False
+        elapsed = ticks_diff(ticks_ms(), self._start)
+        if self.advance_interval_ms and elapsed >= self.advance_interval_ms:
+            self.next()
+            elapsed = 0
+
+        # also picks up brightness changes made on the output directly
+        self._update_tables()
+
+        effect = self.effects[self.current]
+        frame = (elapsed // int(effect.frame_time * 1000)) % effect.frame_count
+        if frame == self._last_frame:
+            return False
+        if self._last_frame >= 0:
+            self.frames_skipped += (frame - self._last_frame - 1) % effect.frame_count
+        self._last_frame = frame
+        self.output.show(self._frames[self.current][frame])
+        self.frames_shown += 1
+        return True
+
+    def activate(self, index):
+        self.current = index % len(self.effects)
+        self._start = ticks_ms()
+        self._last_frame = -1
+
+    def next(self):
+        self.activate(self.current + 1)
+
+    def previous(self):
+        self.activate(self.current - 1)
+
+    def freeze(self):
+        self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self._last_frame = -1
+
+    def fill(self, color):
+        self.output.fill(color)
+        self.output.show()
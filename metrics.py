@@ -0,0 +1,161 @@
+"""
+Low overhead main loop instrumentation, served as plain text at /metrics.
+
+Stage timings are recorded in milliseconds with supervisor.ticks_ms(), which stays a small int so
+recording a sample does not allocate. Each stage keeps its last samples in a fixed size ring
+buffer and a histogram with fixed bucket bounds, both preallocated arrays.
+
+When metrics are disabled, timed() hands back the step function itself, so there is nothing
+left on the hot path.
+"""
+import array
+import gc
+import time
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    # computers do not have supervisor, use the same wrapping millisecond counter
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & _TICKS_MAX
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+# histogram bucket upper bounds in milliseconds, the last bucket counts everything above them
+BUCKET_BOUNDS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+RING_SIZE = 64
+
+
+def ticks_diff(end, start):
+    diff = (end - start) & _TICKS_MAX
+    return ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+
+
+class BootTrace:
+    """
+    Milliseconds from when the trace was created to each named startup stage.
+    """
+
+    def __init__(self):
+        self.start = ticks_ms()
+        # (stage name, milliseconds since start)
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, ticks_diff(ticks_ms(), self.start)))
+
+    def report(self):
+        return "boot: " + ", ".join(f"{name} {ms}ms" for name, ms in self.marks)
+
+
+class Stage:
+    """
+    Timing samples for one stage of the main loop.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0
+        self.max_ms = 0
+        self.ring = array.array("H", [0] * RING_SIZE)
+        self.ring_index = 0
+        self.buckets = array.array("L", [0] * (len(BUCKET_BOUNDS) + 1))
+
+    def add(self, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        self.ring[self.ring_index] = min(duration_ms, 0xffff)
+        self.ring_index = (self.ring_index + 1) % RING_SIZE
+
+        bucket = 0
+        while bucket < len(BUCKET_BOUNDS) and duration_ms > BUCKET_BOUNDS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    def recent(self):
+        """
+        returns the samples in the ring buffer, sorted
+        """
+        return sorted(self.ring[:min(self.count, RING_SIZE)])
+
+
+class Metrics:
+    """
+    Collects stage timings, free memory water marks and counters read from other objects.
+    """
+
+    def __init__(self, enabled=True, boot_trace=None):
+        self.enabled = enabled
+        self.boot_trace = boot_trace
+        self.stages = []
+        # (metric name, object, attribute name) read when the metrics are rendered
+        self.counters = []
+        self.mem_free_low = None
+        self.mem_free_high = None
+
+    def timed(self, name, step):
+        """
+        returns step wrapped to record its duration as stage name, or step itself when disabled
+        """
+        if not self.enabled:
+            return step
+        stage = Stage(name)
+        self.stages.append(stage)
+
+        def timed_step():
+            start = ticks_ms()
+            step()
+            stage.add(ticks_diff(ticks_ms(), start))
+
+        return timed_step
+
+    def add_counter(self, name, source, attribute):
+        self.counters.append((name, source, attribute))
+
+    def sample_memory(self):
+        mem_free = gc.mem_free()
+        if self.mem_free_low is None or mem_free < self.mem_free_low:
+            self.mem_free_low = mem_free
+        if self.mem_free_high is None or mem_free > self.mem_free_high:
+            self.mem_free_high = mem_free
+
+    def render(self):
+        """
+        returns the metrics as plain text, one "name{labels} value" per line
+        """
+        lines = []
+        for stage in self.stages:
+            label = f'stage="{stage.name}"'
+            lines.append(f"badge_stage_count{{{label}}} {stage.count}")
+            lines.append(f"badge_stage_ms_total{{{label}}} {stage.total_ms}")
+            lines.append(f"badge_stage_ms_max{{{label}}} {stage.max_ms}")
+            recent = stage.recent()
+            if recent:
+                lines.append(f"badge_stage_recent_ms_p50{{{label}}} {recent[len(recent) // 2]}")
+                lines.append(f"badge_stage_recent_ms_max{{{label}}} {recent[-1]}")
+            cumulative = 0
+            for bucket, bound in enumerate(BUCKET_BOUNDS):
+                cumulative += stage.buckets[bucket]
+                lines.append(f'badge_stage_ms_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += stage.buckets[-1]
+            lines.append(f'badge_stage_ms_bucket{{{label},le="+Inf"}} {cumulative}')
+
+        if self.boot_trace is not None:
+            for name, ms in self.boot_trace.marks:
+                lines.append(f'badge_boot_ms{{stage="{name}"}} {ms}')
+
+        lines.append(f"badge_mem_free {gc.mem_free()}")
+        if self.mem_free_low is not None:
+            lines.append(f"badge_mem_free_low {self.mem_free_low}")
+            lines.append(f"badge_mem_free_high {self.mem_free_high}")
+
+        for name, source, attribute in self.counters:
+            lines.append(f"{name} {getattr(source, attribute)}")
+        lines.append("")
+        return "\n".join(lines)
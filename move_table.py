@@ -0,0 +1,154 @@
+"""
+Perfect-play tic-tac-toe move lookup for the single player mode.
+
+moves.bin is generated on a computer by tools/gen_move_table.py. It holds every reachable,
+unfinished position reduced by the 8 board symmetries, seen from the side of the player
+about to move. Each record is 5 bytes: the position key as a little endian 16 bit number,
+followed by a 24 bit little endian field with 2 bits of outcome per cell.
+
+The position key is the base 3 number with one digit per cell: 0 empty, 1 the player to move,
+2 the opponent. Cell n is at column n % 3, row n // 3, same as tictactoe_engine.
+"""
+import random
+
+MAGIC = b"TTT1"
+RECORD_SIZE = 5
+
+# outcome of playing a cell, for the player making the move
+OUTCOME_ILLEGAL = 0
+OUTCOME_LOSS = 1
+OUTCOME_DRAW = 2
+OUTCOME_WIN = 3
+
+DIFFICULTY_EASY = 0
+DIFFICULTY_MEDIUM = 1
+DIFFICULTY_HARD = 2
+
+DIFFICULTY_NAMES = ("easy", "medium", "hard")
+
+# chance of picking a move per outcome (loss, draw, win). None always picks the best move.
+DIFFICULTY_WEIGHTS = (
+    (1, 1, 1),
+    (1, 4, 8),
+    None,
+)
+
+# cell permutations for the 8 board symmetries, a transformed board has
+# transformed[cell] = original[permutation[cell]]
+SYMMETRIES = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8),  # identity
+    (6, 3, 0, 7, 4, 1, 8, 5, 2),  # rotate 90
+    (8, 7, 6, 5, 4, 3, 2, 1, 0),  # rotate 180
+    (2, 5, 8, 1, 4, 7, 0, 3, 6),  # rotate 270
+    (2, 1, 0, 5, 4, 3, 8, 7, 6),  # mirror left-right
+    (6, 7, 8, 3, 4, 5, 0, 1, 2),  # mirror top-bottom
+    (0, 3, 6, 1, 4, 7, 2, 5, 8),  # mirror main diagonal
+    (8, 5, 2, 7, 4, 1, 6, 3, 0),  # mirror anti diagonal
+)
+
+
+def position_key(me_mask, them_mask, permutation):
+    """
+    returns the base 3 key of a position after applying a symmetry permutation
+    """
+    key = 0
+    for cell in range(8, -1, -1):
+        bit = 1 << permutation[cell]
+        key *= 3
+        if me_mask & bit:
+            key += 1
+        elif them_mask & bit:
+            key += 2
+    return key
+
+
+def canonical_key(me_mask, them_mask):
+    """
+    returns (key, permutation) for the symmetry that gives the smallest position key
+    """
+    best_key = None
+    best_permutation = None
+    for permutation in SYMMETRIES:
+        key = position_key(me_mask, them_mask, permutation)
+        if best_key is None or key < best_key:
+            best_key = key
+            best_permutation = permutation
+    return best_key, best_permutation
+
+
+class MoveTable:
+    """
+    Looks up move outcomes in moves.bin and picks moves for the badge player.
+    """
+
+    def __init__(self, filename="moves.bin"):
+        with open(filename, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filename} is not a move table")
+        self.data = data
+        self.offset = len(MAGIC)
+        self.count = (len(data) - self.offset) // RECORD_SIZE
+        self.outcomes = bytearray(9)
+
+    def _find(self, key):
+        low = 0
+        high = self.count - 1
+        while low <= high:
+            mid = (low + high) // 2
+            record = self.offset + mid * RECORD_SIZE
+            mid_key = self.data[record] | (self.data[record + 1] << 8)
+            if mid_key == key:
+                return record
+            if mid_key < key:
+                low = mid + 1
+            else:
+                high = mid - 1
+        return None
+
+    def lookup(self, me_mask, them_mask):
+        """
+        fill self.outcomes with the outcome of each cell for the player to move and return it.
+        Raises KeyError if the position is finished or unreachable.
+        """
+        key, permutation = canonical_key(me_mask, them_mask)
+        record = self._find(key)
+        if record is None:
+            raise KeyError(key)
+        packed = self.data[record + 2] | (self.data[record + 3] << 8) | (self.data[record + 4] << 16)
+        for cell in range(9):
+            # cell in the canonical board maps back to permutation[cell] on the real board
+            self.outcomes[permutation[cell]] = (packed >> (cell * 2)) & 0b11
+        return self.outcomes
+
+    def choose_move(self, me_mask, them_mask, difficulty=DIFFICULTY_HARD):
+        """
+        returns the cell index the player to move should play
+        """
+        outcomes = self.lookup(me_mask, them_mask)
+        weights = DIFFICULTY_WEIGHTS[difficulty]
+
+        if weights is None:
+            best = max(outcomes)
+            total = 0
+            for outcome in outcomes:
+                if outcome == best:
+                    total += 1
+            pick = random.randint(0, total - 1)
+            for cell, outcome in enumerate(outcomes):
+                if outcome == best:
+                    if pick == 0:
+                        return cell
+                    pick -= 1
+
+        total = 0
+        for outcome in outcomes:
+            if outcome != OUTCOME_ILLEGAL:
+                total += weights[outcome - 1]
+        pick = random.randint(0, total - 1)
+        for cell, outcome in enumerate(outcomes):
+            if outcome != OUTCOME_ILLEGAL:
+                pick -= weights[outcome - 1]
+                if pick < 0:
+                    return cell
+        raise KeyError("no legal moves")
@@ -0,0 +1,114 @@
+from metrics import ticks_ms, ticks_diff
+
+
+class RefreshScheduler:
+    """
+    Collects display refresh requests and turns them into as few e-ink refreshes as the panel allows.
+
+    Callers mark the screen dirty with request() and the main loop calls poll(). Requests that arrive
+    while a refresh is already pending are merged into it, and a refresh that would land before
+    display.time_to_refresh allows is deferred to a later poll() instead of sleeping.
+
+    The Badger2040W panel always redraws the whole screen, so dirty regions are used to decide how
+    urgent a refresh is: a full-screen request (region=None) goes out as soon as the panel is ready,
+    while small region requests such as selector moves wait settle_time for further requests
+    so a burst of button presses ends up as a single update. Each request pushes the refresh back,
+    but never past max_wait after the first pending request, so steady input still gets drawn.
+    Times are kept in ticks_ms, which do not lose precision the way float monotonic() does after
+    long uptimes.
+    """
+
+    def __init__(self, display, settle_time=0.25, max_wait=1.0):
+        self.display = display
+        self.settle_time_ms = int(settle_time * 1000)
+        self.max_wait_ms = int(max_wait * 1000)
+
+        # bounding box of everything marked dirty since the last refresh as (x1, y1, x2, y2),
+        # or None when nothing is pending
+        self.dirty_region = None
+        self.full_refresh = False
+        self._refresh_after = 0
+        # ticks of the first request since the last refresh
+        self._first_request = 0
+        self._deferred_pending = False
+
+        # counters
+        self.requested = 0
+        self.merged = 0
+        self.deferred = 0
+        self.refreshes = 0
+        # refreshes the display refused with a RuntimeError
+        self.errors = 0
+
+    @property
+    def pending(self):
+        return self.dirty_region is not None
+
+    def request(self, region=None):
+        """
+        Mark a region of the display as dirty. region is (x, y, width, height), or None for the whole display.
+        """
+        self.requested += 1
+        if self.dirty_region is not None:
+            self.merged += 1
+
+        now = ticks_ms()
+        if region is None:
+            self.full_refresh = True
+            self.dirty_region = (0, 0, self.display.width, self.display.height)
+            self._refresh_after = now
+            return
+
+        x1, y1 = region[0], region[1]
+        x2, y2 = x1 + region[2], y1 + region[3]
+        if self.dirty_region is None:
+            self.dirty_region = (x1, y1, x2, y2)
+            self._first_request = now
+        else:
+            self.dirty_region = (min(x1, self.dirty_region[0]), min(y1, self.dirty_region[1]),
+                                 max(x2, self.dirty_region[2]), max(y2, self.dirty_region[3]))
+
+        if not self.full_refresh:
+            self._refresh_after = now + self.settle_time_ms
+            if ticks_diff(self._refresh_after, self._first_request) > self.max_wait_ms:
+                self._refresh_after = self._first_request + self.max_wait_ms
+
+    def poll(self):
+        """
+        Refresh the display if something is pending and the panel is ready. Returns True if a refresh happened.
+        """
+        if self.dirty_region is None:
+            return False
+
+        if ticks_diff(ticks_ms(), self._refresh_after) < 0:
+            return False
+
+        if self.display.time_to_refresh > 0:
+            self._defer()
+            return False
+
+        try:
+            self.display.refresh()
+        except RuntimeError as e:
+            print("Caught Runtime error, probably refreshed too soon.")
+            print(e)
+            self.errors += 1
+            self._defer()
+            return False
+
+        self.refreshes += 1
+        self.dirty_region = None
+        self.full_refresh = False
+        self._deferred_pending = False
+        return True
+
+    def _defer(self):
+        # count each pending refresh once, no matter how many polls it has to wait
+        if not self._deferred_pending:
+            self._deferred_pending = True
+            self.deferred += 1
+
+    def report(self):
+        return (f"refreshes requested: {self.requested} merged: {self.merged} "
+                f"deferred: {self.deferred} done: {self.refreshes} "
+                f"saved: {self.requested - self.refreshes}")
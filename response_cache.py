@@ -0,0 +1,68 @@
+"""
+Cache for rendered HTML templates.
+
+The rendered bytes are kept along with the values that were formatted into the template, and the
+template is only rendered again when one of those values changes. Each rendering gets an ETag
+so clients that already have the page can be answered with 304 Not Modified.
+"""
+import binascii
+
+
+def etag_matches(if_none_match, etag):
+    """
+    returns True if an If-None-Match header value includes etag
+    """
+    if if_none_match is None or etag is None:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate in (etag, "*", "W/" + etag):
+            return True
+    return False
+
+
+class RenderCache:
+    """
+    Keeps the last rendering of a template, keyed on the values formatted into it.
+    Pass filename instead of template to read the template on the first render.
+    """
+
+    def __init__(self, template=None, filename=None):
+        self.template = template
+        self.filename = filename
+        self.values = None
+        self.body = None
+        self.etag = None
+
+        # counters
+        self.renders = 0
+        self.hits = 0
+        self.not_modified = 0
+
+    def render(self, *values):
+        """
+        returns the template formatted with values as bytes, rendering it only if values changed
+        """
+        if values != self.values:
+            if self.template is None:
+                with open(self.filename, "r") as f:
+                    self.template = f.read()
+            self.values = values
+            self.body = self.template.format(*values).encode("utf-8")
+            self.etag = f'"{binascii.crc32(self.body):08x}"'
+            self.renders += 1
+        else:
+            self.hits += 1
+        return self.body
+
+    def matches(self, if_none_match):
+        """
+        returns True if an If-None-Match header value includes the current ETag
+        """
+        if etag_matches(if_none_match, self.etag):
+            self.not_modified += 1
+            return True
+        return False
+
+    def report(self):
+        return f"renders: {self.renders} cache hits: {self.hits} not modified: {self.not_modified}"
@@ -0,0 +1,185 @@
+"""
+Append-only all time score journal stored in NVM.
+
+Instead of rewriting the whole score dict on every win, small fixed size records are appended
+through the journal region, and all_time_score is rebuilt at startup by replaying them.
+
+Every record is 8 bytes:
+    0     record type, RECORD_SNAPSHOT or RECORD_DELTA
+    1-2   sequence number, little endian, one more than the previous record
+    3-6   snapshot: X and O totals as little endian 16 bit numbers
+          delta: X wins, O wins, then 2 unused bytes
+    7     checksum of bytes 0-6
+
+Replay starts at a snapshot at the beginning of the region and stops at the first record that
+is blank, fails its checksum or breaks the sequence. When the region is full it is compacted
+into a single snapshot. Scores stop counting at MAX_SCORE, the largest a snapshot can hold.
+"""
+import time
+
+import microcontroller
+
+RECORD_SIZE = 8
+RECORD_SNAPSHOT = 0x01
+RECORD_DELTA = 0x02
+
+# the start of NVM is left for the data foamyguy_nvm_helper saved before the journal existed
+JOURNAL_START = 256
+
+# largest win count a single delta record can hold
+MAX_DELTA = 255
+# largest score a snapshot record can hold
+MAX_SCORE = 0xffff
+
+
+def _checksum(record):
+    total = 0
+    for i in range(RECORD_SIZE - 1):
+        total += record[i]
+    # the xor keeps blank (all 0x00 or all 0xff) records from looking valid
+    return (total & 0xff) ^ 0xa5
+
+
+class ScoreJournal:
+    """
+    Keeps the all time scores in NVM as a journal of debounced win records.
+    """
+
+    def __init__(self, nvm=None, start=JOURNAL_START, end=None, commit_delay=10):
+        self.nvm = nvm if nvm is not None else microcontroller.nvm
+        self.start = start
+        self.end = end if end is not None else len(self.nvm)
+        # seconds to wait after a win before writing it, so wins close together become one write
+        self.commit_delay = commit_delay
+
+        self.scores = {"X": 0, "O": 0}
+        self.sequence = 0
+        self.write_offset = self.start
+
+        self.pending_x = 0
+        self.pending_o = 0
+        self.pending_since = None
+
+        self._record = bytearray(RECORD_SIZE)
+
+        # counters
+        self.wins = 0
+        self.commits = 0
+        self.compactions = 0
+
+    def load(self):
+        """
+        Rebuild the scores by replaying the journal. Returns False if there is no journal in NVM yet.
+        """
+        data = self.nvm[self.start:self.end]
+        offset = 0
+        found_snapshot = False
+        while offset + RECORD_SIZE <= len(data):
+            record_type = data[offset]
+            sequence = data[offset + 1] | (data[offset + 2] << 8)
+            if data[offset + RECORD_SIZE - 1] != _checksum(data[offset:offset + RECORD_SIZE]):
+                break
+            if not found_snapshot:
+                if record_type != RECORD_SNAPSHOT:
+                    break
+                found_snapshot = True
+                self.scores["X"] = data[offset + 3] | (data[offset + 4] << 8)
+                self.scores["O"] = data[offset + 5] | (data[offset + 6] << 8)
+            elif record_type != RECORD_DELTA or sequence != (self.sequence + 1) & 0xffff:
+                break
+            else:
+                self.scores["X"] += data[offset + 3]
+                self.scores["O"] += data[offset + 4]
+            self.sequence = sequence
+            offset += RECORD_SIZE
+
+        self.write_offset = self.start + offset
+        return found_snapshot
+
+    def add_win(self, player):
+        """
+        Count a win for "X" or "O". It gets written to NVM by poll() once commit_delay has passed.
+        """
+        if self.scores[player] >= MAX_SCORE:
+            return
+        self.scores[player] += 1
+        self.wins += 1
+        if player == "X":
+            self.pending_x += 1
+        else:
+            self.pending_o += 1
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+
+    @property
+    def pending(self):
+        return self.pending_since is not None
+
+    def poll(self):
+        """
+        Write pending wins if they have waited commit_delay seconds. Returns True if NVM was written.
+        """
+        if self.pending_since is None:
+            return False
+        if (time.monotonic() - self.pending_since < self.commit_delay
+                and self.pending_x < MAX_DELTA and self.pending_o < MAX_DELTA):
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        """
+        Write any pending wins right away.
+        """
+        if self.pending_since is None:
+            return
+        if self.write_offset + RECORD_SIZE > self.end:
+            # no room left, the snapshot already includes the pending wins
+            self.reset(self.scores["X"], self.scores["O"])
+            return
+
+        self.sequence = (self.sequence + 1) & 0xffff
+        self._fill_record(RECORD_DELTA, self.pending_x, self.pending_o, 0, 0)
+        self.nvm[self.write_offset:self.write_offset + RECORD_SIZE] = self._record
+        self.write_offset += RECORD_SIZE
+        self.commits += 1
+        self._clear_pending()
+
+    def reset(self, x_score=0, o_score=0):
+        """
+        Compact the journal into a single snapshot record holding the given scores, at most MAX_SCORE each.
+        """
+        x_score = min(max(x_score, 0), MAX_SCORE)
+        o_score = min(max(o_score, 0), MAX_SCORE)
+        self.scores["X"] = x_score
+        self.scores["O"] = o_score
+        self.sequence = (self.sequence + 1) & 0xffff
+        self._fill_record(RECORD_SNAPSHOT, x_score & 0xff, x_score >> 8, o_score & 0xff, o_score >> 8)
+
+        # write the snapshot and blank the rest of the region in one go
+        region = bytearray(b"\xff" * (self.end - self.start))
+        region[0:RECORD_SIZE] = self._record
+        self.nvm[self.start:self.end] = region
+        self.write_offset = self.start + RECORD_SIZE
+        self.compactions += 1
+        self._clear_pending()
+
+    def _fill_record(self, record_type, byte_3, byte_4, byte_5, byte_6):
+        record = self._record
+        record[0] = record_type
+        record[1] = self.sequence & 0xff
+        record[2] = self.sequence >> 8
+        record[3] = byte_3
+        record[4] = byte_4
+        record[5] = byte_5
+        record[6] = byte_6
+        record[7] = _checksum(record)
+
+    def _clear_pending(self):
+        self.pending_x = 0
+        self.pending_o = 0
+        self.pending_since = None
+
+    def report(self):
+        return (f"score journal wins: {self.wins} commits: {self.commits} compactions: {self.compactions} "
+                f"used: {self.write_offset - self.start}/{self.end - self.start} bytes")
@@ -0,0 +1,74 @@
+"""
+Score text drawn straight from the built in font's glyph tiles.
+
+terminalio.FONT keeps all of its glyphs as tiles of one bitmap, so each line of text can be a
+TileGrid over that bitmap with one tile per character. The fixed text of the template is written
+into the tiles once, and the digit fields are updated by changing a few tile indices, which does
+not allocate the way rebuilding a bitmap_label does.
+"""
+import displayio
+import terminalio
+
+
+class ScoreText(displayio.Group):
+    """
+    Text from a template where each "{}" is a field of `digits` digits, at most one per line.
+    Set the fields with set_value(field, value), fields are numbered from the top.
+    """
+
+    def __init__(self, template, digits, color, scale=1, line_spacing=1.25, font=terminalio.FONT):
+        super().__init__(scale=scale)
+        glyph_width, glyph_height = font.get_bounding_box()
+        line_height = int(glyph_height * line_spacing)
+
+        self.palette = displayio.Palette(2)
+        self.palette.make_transparent(0)
+        self.palette[1] = color
+
+        # tile index of each digit glyph and of a blank
+        self.digit_tiles = bytes(font.get_glyph(ord(digit)).tile_index for digit in "0123456789")
+        self.blank_tile = font.get_glyph(ord(" ")).tile_index
+        self.digits = digits
+        self.max_value = 10 ** digits - 1
+
+        # (TileGrid, column of the first digit) for each field
+        self.fields = []
+        columns = 0
+        for row, line in enumerate(template.split("\n")):
+            text = line.replace("{}", " " * digits)
+            columns = max(columns, len(text))
+            if not text:
+                continue
+            line_grid = displayio.TileGrid(font.bitmap, pixel_shader=self.palette, width=len(text), height=1,
+                                           tile_width=glyph_width, tile_height=glyph_height, y=row * line_height)
+            for column, char in enumerate(text):
+                line_grid[column] = font.get_glyph(ord(char)).tile_index
+            if "{}" in line:
+                self.fields.append((line_grid, line.index("{}")))
+            self.append(line_grid)
+
+        # width on the display in pixels
+        self.width = columns * glyph_width * scale
+
+        for field in range(len(self.fields)):
+            self.set_value(field, 0)
+
+    def set_value(self, field, value):
+        """
+        show value left aligned in field, values too big for the field show as all nines
+        """
+        line_grid, column = self.fields[field]
+        value = min(max(value, 0), self.max_value)
+
+        length = 1
+        rest = value // 10
+        while rest:
+            length += 1
+            rest //= 10
+
+        for position in range(self.digits - 1, -1, -1):
+            if position >= length:
+                line_grid[column + position] = self.blank_tile
+            else:
+                line_grid[column + position] = self.digit_tiles[value % 10]
+                value //= 10
@@ -0,0 +1,9 @@
+"""
+Host-side simulator for running code.py on a computer.
+
+sim/stubs holds stand-ins for the CircuitPython modules and libraries code.py imports, all driven by
+the Hardware instance in sim.hardware. sim.harness runs code.py against scripted button presses and
+HTTP requests, and sim.bench replays sessions and reports timing, refresh and allocation numbers:
+
+    python3 -m sim.bench
+"""
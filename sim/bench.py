@@ -0,0 +1,179 @@
+"""
+Benchmark suite that replays badge sessions through the simulator.
+
+Run from the repo root:
+
+    python3 -m sim.bench              # all scenarios
+    python3 -m sim.bench game http    # only some of them
+    python3 -m sim.bench --trace-memory
+
+Each scenario reports the boot trace, step time percentiles for every runtime task, display refresh counts,
+NeoPixel writes, and allocation numbers: CPython garbage collections and the change in allocated
+blocks, plus peak traced memory with --trace-memory.
+"""
+import sys
+
+from sim.hardware import Hardware
+from sim.harness import Simulation
+
+BUTTON_UP = 0
+BUTTON_DOWN = 1
+BUTTON_A = 2
+BUTTON_B = 3
+BUTTON_C = 4
+
+
+def idle_badge():
+    """
+    Badge screen with LED animations running and nothing else going on.
+    """
+    return Hardware(duration=4)
+
+
+def game_session():
+    """
+    Start tic-tac-toe, play quickly with bursts of selector moves, then go back to the badge.
+    """
+    badge = Hardware(duration=14)
+    badge.chord(0.3, BUTTON_A, BUTTON_C)
+    at = 1.0
+    for turn in range(24):
+        if turn % 3 == 0:
+            # a quick burst of selector moves, should end up as one refresh
+            for key in (BUTTON_UP, BUTTON_C, BUTTON_DOWN, BUTTON_A):
+                badge.press(at, key, hold=0.03)
+                at += 0.08
+        # play at the selector, or start a new game on the game over screen
+        badge.press(at, BUTTON_B)
+        at += 0.35
+    badge.chord(at + 0.5, BUTTON_A, BUTTON_C)
+    return badge
+
+
+def logged_games():
+    """
+    Play whole games by only pressing B, then fetch the game statistics and the raw game log.
+    """
+    badge = Hardware(duration=16)
+    badge.chord(0.3, BUTTON_A, BUTTON_C)
+    at = 1.0
+    for _ in range(40):
+        # plays at the selector, which always moves to an empty cell, or starts a new game
+        badge.press(at, BUTTON_B)
+        at += 0.3
+    badge.request(at + 0.5, "GET", "/api/games")
+    badge.request(at + 0.6, "GET", "/api/games/log")
+    return badge
+
+
+def input_burst():
+    """
+    Bursts of queued button events in the game, to see how long the last event of a burst waits.
+    """
+    badge = Hardware(duration=8)
+    badge.chord(0.3, BUTTON_A, BUTTON_C)
+    for at in (1.5, 3.5, 5.5):
+        badge.burst(at, (BUTTON_UP, BUTTON_C, BUTTON_C, BUTTON_DOWN, BUTTON_A, BUTTON_UP, BUTTON_A, BUTTON_DOWN))
+    return badge
+
+
+def http_traffic():
+    """
+    Lots of phones loading the index and color picker pages, some revalidating, plus LED API calls.
+    """
+    badge = Hardware(duration=5)
+    at = 0.2
+    for i in range(80):
+        if i % 2:
+            # the ETag of the index page for the starting color and scores
+            badge.request(at, "GET", "/", headers={"If-None-Match": _index_etag()})
+        else:
+            badge.request(at, "GET", "/")
+        if i % 10 == 5:
+            badge.request(at, "POST", "/api/leds", headers={"Content-Type": "application/json"},
+                          body=b'[["fill", "#102030"], ["pixel", 3, "#ff0000"], ["brightness", 0.3]]')
+        if i % 20 == 10:
+            badge.request(at, "GET", "/?neopixel_color=%23ff00ff")
+        if i % 4 == 1:
+            # the color picker page, compressed and plain
+            headers = {"Accept-Encoding": "gzip, deflate"} if i % 8 == 1 else {}
+            badge.request(at, "GET", "/color_picker.html", headers=headers)
+        at += 0.05
+    return badge
+
+
+def _index_etag():
+    # imported here so the harness gets to load the badge modules fresh for each run
+    from response_cache import RenderCache  # pylint: disable=import-outside-toplevel
+
+    with open("static/index.html", "r") as f:
+        cache = RenderCache(f.read())
+    cache.render("", 0, 0)
+    return cache.etag
+
+
+SCENARIOS = {
+    "idle": idle_badge,
+    "game": game_session,
+    "input": input_burst,
+    "games": logged_games,
+    "http": http_traffic,
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def report(name, result):
+    badge = result.hardware
+    print(f"{name}: {result.wall_time:.1f}s")
+    print(f"  {'task':14s} {'steps':>6s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}")
+    for task_name, times in result.step_times.items():
+        times = sorted(times)
+        print(f"  {task_name:14s} {len(times):6d} {percentile(times, 0.5) * 1000:8.3f} "
+              f"{percentile(times, 0.9) * 1000:8.3f} {percentile(times, 0.99) * 1000:8.3f} {times[-1] * 1000:8.3f}")
+
+    boot_trace = result.namespace.get("boot_trace")
+    if boot_trace is not None:
+        print(f"  {boot_trace.report()}")
+    print(f"  display refreshes: {badge.display.refreshes} refused: {badge.display.refused_refreshes}")
+    refresher = result.namespace.get("refresher")
+    if refresher is not None:
+        print(f"  {refresher.report()}")
+    print(f"  neopixel writes: {badge.pixel_shows}")
+    game_log = result.namespace.get("game_log")
+    if game_log is not None and game_log.games_added:
+        print(f"  {game_log.report()}")
+    if badge.key_latencies:
+        latencies = sorted(badge.key_latencies)
+        print(f"  key events: {len(latencies)} latency p50 {percentile(latencies, 0.5) * 1000:.1f}ms "
+              f"max {latencies[-1] * 1000:.1f}ms")
+
+    handled = [exchange for exchange in badge.http_exchanges if exchange.status is not None]
+    if handled:
+        statuses = {}
+        for exchange in handled:
+            statuses[exchange.status] = statuses.get(exchange.status, 0) + 1
+        latency = sum(exchange.handled_at - exchange.at for exchange in handled) / len(handled)
+        sent = sum(exchange.response_size for exchange in handled)
+        print(f"  http: {len(handled)} requests {statuses}, {sent} body bytes, "
+              f"avg wait {latency * 1000:.1f}ms")
+
+    print(f"  gc collections: {result.gc_collections} allocated blocks change: {result.allocated_blocks}")
+    if result.peak_memory is not None:
+        print(f"  peak traced memory: {result.peak_memory} bytes")
+
+
+def main(argv):
+    trace_memory = "--trace-memory" in argv
+    names = [arg for arg in argv if not arg.startswith("--")] or list(SCENARIOS)
+    for name in names:
+        result = Simulation(SCENARIOS[name](), trace_memory=trace_memory).run()
+        report(name, result)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
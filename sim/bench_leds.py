@@ -0,0 +1,103 @@
+"""
+Frames per second of the lookup table LED engine against the real adafruit_led_animation.
+
+The library has to be the CPython source of the version bundled in lib/, for example:
+
+    pip install --no-deps --target /tmp/led_animation adafruit-circuitpython-led-animation==2.9.0
+    python3 -m sim.bench_leds /tmp/led_animation [seconds]
+
+Both sides draw every frame back to back for the given number of seconds per effect, the library
+side with its own draw() and show() on the neopixel stand-in, the lookup table side with one
+neopixel_write() of a precomputed frame. Both run on CPython on a computer, which is far faster
+than the RP2040 and has a different cost per operation, so the ratio is only a rough guide to
+the badge.
+"""
+import os
+import sys
+import time
+
+from sim import hardware
+from sim.harness import REPO_ROOT, STUBS_DIR
+
+PIXEL_COUNT = 8
+
+
+def _frames_per_second(draw_frame, seconds):
+    frames = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            draw_frame()
+        frames += 100
+    return frames / (time.perf_counter() - start)
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 2
+    seconds = float(argv[1]) if len(argv) > 1 else 1.0
+    for path in (REPO_ROOT, STUBS_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # the real library goes ahead of the stand-in
+    sys.path.insert(0, argv[0])
+    os.chdir(REPO_ROOT)
+    hardware.current = hardware.Hardware()
+
+    # pylint: disable=import-outside-toplevel
+    import board
+    import neopixel
+    import adafruit_led_animation
+    import lut_animation
+    from led_output import LedOutput
+    from adafruit_led_animation.animation.rainbow import Rainbow
+    from adafruit_led_animation.animation.rainbowchase import RainbowChase
+    from adafruit_led_animation.animation.rainbowcomet import RainbowComet
+    from adafruit_led_animation.animation.rainbowsparkle import RainbowSparkle
+
+    print(f"adafruit_led_animation from {os.path.dirname(adafruit_led_animation.__file__)}")
+    pixels = neopixel.NeoPixel(board.SDA, PIXEL_COUNT, brightness=0.2)
+    library = (
+        RainbowComet(pixels, speed=0.1, tail_length=11, bounce=True),
+        Rainbow(pixels, speed=0.1, period=2),
+        RainbowSparkle(pixels, speed=0.1, num_sparkles=5),
+        RainbowChase(pixels, speed=0.1, size=5, spacing=3),
+    )
+
+    start = time.perf_counter()
+    lut = lut_animation.LutAnimationSequence(
+        LedOutput(pixels, brightness=0.2),
+        lut_animation.rainbow_comet(PIXEL_COUNT, speed=0.1, tail_length=11, bounce=True),
+        lut_animation.rainbow(speed=0.1, period=2),
+        lut_animation.rainbow_sparkle(speed=0.1, num_sparkles=5),
+        lut_animation.rainbow_chase(speed=0.1, size=5, spacing=3),
+    )
+    build_time = time.perf_counter() - start
+    print(f"tables: {lut.table_size} bytes, built in {build_time * 1000:.1f}ms")
+
+    print(f"{'effect':16s} {'library fps':>12s} {'table fps':>12s} {'speedup':>8s}")
+    for index, animation in enumerate(library):
+        def library_frame(animation=animation):
+            animation.draw()
+            animation.show()
+
+        frames = lut._frames[index]  # pylint: disable=protected-access
+        position = [0]
+
+        def table_frame(frames=frames, position=position):
+            position[0] = (position[0] + 1) % len(frames)
+            lut.output.show(frames[position[0]])
+
+        library_fps = _frames_per_second(library_frame, seconds)
+        table_fps = _frames_per_second(table_frame, seconds)
+        print(f"{lut.effects[index].name:16s} {library_fps:12.0f} {table_fps:12.0f} "
+              f"{table_fps / library_fps:7.1f}x")
+
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
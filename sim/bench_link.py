@@ -0,0 +1,207 @@
+"""
+Move round trip times of the badge link under simulated packet loss.
+
+Run from the repo root on Linux:
+
+    python3 -m sim.bench_link [games per loss rate] [--delay ms]
+
+Two BadgeLinks play random games against each other over UDP on 127.0.0.1, each with its own
+BitBoard, like two badges would. Every datagram either side sends is dropped at the loss rate,
+and with --delay held back for that many milliseconds first. Both links are polled every
+POLL_INTERVAL like the runtime task on the badge. A move's round trip is from send_move() until
+the other side has acknowledged it, so lost moves and lost acks show up as retransmit time.
+"""
+import random
+import socket
+import sys
+import time
+
+from sim.harness import REPO_ROOT, STUBS_DIR
+
+LOSS_RATES = (0.0, 0.05, 0.1, 0.2, 0.3)
+# the badge link runtime task interval in code.py
+POLL_INTERVAL = 0.01
+BASE_PORT = 18124
+# give up on a loss rate after this many seconds
+TIME_LIMIT = 300
+
+
+class LossySocket:
+    """
+    UDP socket that drops or delays datagrams it sends.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # (due time, datagram, address) held back by the delay
+        self.delayed = []
+
+    def bind(self, address):
+        self.socket.bind(address)
+
+    def setblocking(self, flag):
+        self.socket.setblocking(flag)
+
+    def recvfrom_into(self, buffer):
+        return self.socket.recvfrom_into(buffer)
+
+    def sendto(self, data, address):
+        if self.pool.rng.random() < self.pool.loss:
+            self.pool.dropped += 1
+            return len(data)
+        if self.pool.delay:
+            self.delayed.append((time.monotonic() + self.pool.delay, bytes(data), address))
+            return len(data)
+        return self.socket.sendto(data, address)
+
+    def pump(self):
+        now = time.monotonic()
+        while self.delayed and self.delayed[0][0] <= now:
+            _, data, address = self.delayed.pop(0)
+            self.socket.sendto(data, address)
+
+    def close(self):
+        self.socket.close()
+
+
+class LossyPool:
+    """
+    Stands in for socketpool.SocketPool, with the loss rate and delay shared by its sockets.
+    """
+
+    AF_INET = socket.AF_INET
+    SOCK_DGRAM = socket.SOCK_DGRAM
+
+    def __init__(self, loss, delay, seed):
+        self.loss = loss
+        self.delay = delay
+        self.rng = random.Random(seed)
+        self.dropped = 0
+        self.sockets = []
+
+    def socket(self, family, socket_type):  # pylint: disable=unused-argument
+        lossy_socket = LossySocket(self)
+        self.sockets.append(lossy_socket)
+        return lossy_socket
+
+
+class Player:
+    """
+    One badge: a BitBoard, whose turn it is, and its BadgeLink.
+    """
+
+    def __init__(self, pool, port, peer_port, rng):
+        # imported here so the repo modules are found once main() has set up sys.path
+        from badge_link import BadgeLink  # pylint: disable=import-outside-toplevel
+        from tictactoe_engine import BitBoard  # pylint: disable=import-outside-toplevel
+
+        self.board = BitBoard()
+        self.turn = "X"
+        self.rng = rng
+        self.link = BadgeLink(pool, ("127.0.0.1", peer_port), lambda: self.board, self.on_move, self.on_new_game,
+                              port=port, bind_address="127.0.0.1")
+        self.move_sent_at = None
+        self.games = 0
+
+    def on_move(self, cell):
+        if self.turn == self.link.local_piece or not self.board.is_empty(cell):
+            return False
+        self.board.play(self.turn, cell)
+        self.turn = self.link.local_piece
+        return True
+
+    def on_new_game(self, first_piece):
+        self.board.reset()
+        self.turn = first_piece
+        self.games += 1
+
+    @property
+    def game_over(self):
+        return self.board.check_winner() is not None or self.board.empty_count == 0
+
+    def step(self, round_trips):
+        """
+        Play a random move when it is this badge's turn, and time the move until it is acknowledged.
+        """
+        link = self.link
+        if self.move_sent_at is not None and not link.waiting:
+            round_trips.append(time.perf_counter() - self.move_sent_at)
+            self.move_sent_at = None
+        # moves are only timed on their own, so wait for any earlier message to be acknowledged
+        if not link.paired or link.waiting or self.turn != link.local_piece or self.game_over:
+            return
+        cell = self.board.nth_empty(self.rng.randrange(self.board.empty_count))
+        self.board.play(self.turn, cell)
+        self.turn = "O" if self.turn == "X" else "X"
+        link.send_move(cell)
+        self.move_sent_at = time.perf_counter()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run(loss, delay, games, port, seed=0):
+    pool = LossyPool(loss, delay, seed)
+    rng = random.Random(seed)
+    players = (Player(pool, port, port + 1, rng), Player(pool, port + 1, port, rng))
+    for player in players:
+        player.link.start()
+
+    round_trips = []
+    mismatched = 0
+    deadline = time.monotonic() + TIME_LIMIT
+    while players[0].games <= games and time.monotonic() < deadline:
+        for lossy_socket in pool.sockets:
+            lossy_socket.pump()
+        for player in players:
+            player.link.poll()
+            player.step(round_trips)
+        for player in players:
+            # X starts the next game once both boards show the game is over
+            if (player.link.local_piece == "X" and player.game_over and not player.link.waiting
+                    and players[0].game_over and players[1].game_over):
+                if players[0].board.x_mask != players[1].board.x_mask or \
+                        players[0].board.o_mask != players[1].board.o_mask:
+                    mismatched += 1
+                player.link.request_new_game()
+        time.sleep(POLL_INTERVAL)
+
+    for lossy_socket in pool.sockets:
+        lossy_socket.close()
+
+    round_trips.sort()
+    links = [player.link for player in players]
+    print(f"loss {loss * 100:4.0f}%  games {players[0].games - 1:4d}  moves {len(round_trips):5d}  "
+          f"rtt p50 {percentile(round_trips, 0.5) * 1000:6.1f}ms  p90 {percentile(round_trips, 0.9) * 1000:6.1f}ms  "
+          f"p99 {percentile(round_trips, 0.99) * 1000:6.1f}ms  max {(round_trips[-1] if round_trips else 0) * 1000:6.1f}ms  "
+          f"dropped {pool.dropped:4d}  retransmits {sum(link.retransmits for link in links):4d}  "
+          f"timeouts {sum(link.timeouts for link in links)}  desyncs {sum(link.desyncs for link in links)}  "
+          f"boards differ {mismatched}")
+
+
+def main(argv):
+    delay = 0
+    if "--delay" in argv:
+        index = argv.index("--delay")
+        delay = float(argv[index + 1]) / 1000
+        argv = argv[:index] + argv[index + 2:]
+    games = int(argv[0]) if argv else 20
+
+    for path in (REPO_ROOT, STUBS_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+    # only the repo modules are needed, badge_link runs on the computer's own sockets
+    sys.path.insert(0, REPO_ROOT)
+
+    print(f"{games} games per loss rate, polled every {POLL_INTERVAL * 1000:.0f}ms, "
+          f"one way delay {delay * 1000:.0f}ms")
+    for index, loss in enumerate(LOSS_RATES):
+        run(loss, delay, games, BASE_PORT + index * 2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,134 @@
+"""
+Serves static/ and the game log through the real adafruit_httpserver over real sockets, and
+checks what a browser gets back. The sim's stand-in server never sends bytes on a socket, so
+this is the check for StaticFileResponse and the internals of the library it relies on.
+
+The library has to be the CPython source of the version bundled in lib/, for example:
+
+    pip install --no-deps --target /tmp/httpserver adafruit-circuitpython-httpserver==4.5.8
+    python3 -m sim.check_http /tmp/httpserver
+
+Every file in static/ is fetched plain, gzipped when it has a .gz copy, and again with its ETag
+for 304 Not Modified. Then a few games are logged to a temporary directory and /api/games/log is
+downloaded and decoded. Exits with status 1 if any check fails.
+"""
+import gzip
+import http.client
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+from sim.harness import REPO_ROOT, STUBS_DIR
+
+PORT = 18080
+
+
+def fetch(path, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=5)
+    connection.request("GET", path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 2
+    for path in (REPO_ROOT, STUBS_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+    sys.path.insert(0, REPO_ROOT)
+    sys.path.insert(0, argv[0])
+    os.chdir(REPO_ROOT)
+
+    # pylint: disable=import-outside-toplevel
+    import adafruit_httpserver
+    from adafruit_httpserver import Server, GET, OK_200
+
+    from game_log import GameLog, RESULT_X_WINS, RESULT_DRAW, decode_record
+    from static_files import StaticFiles, StaticFileResponse
+
+    print(f"adafruit_httpserver {adafruit_httpserver.__version__} from {os.path.dirname(adafruit_httpserver.__file__)}")
+    server = Server(socket, "/static")
+    static_files = StaticFiles(server, "static")
+
+    log_directory = tempfile.mkdtemp()
+    game_log = GameLog(log_directory)
+
+    @server.route("/api/games/log", GET)
+    def games_log_handler(request):
+        # the same response as the handler in code.py
+        game_log.flush()
+        size = game_log.log_size()
+        headers = {"Cache-Control": "no-store", "Content-Disposition": 'attachment; filename="games.bin"'}
+        return StaticFileResponse(request, static_files, game_log.log_path if size else None, size, status=OK_200,
+                                  headers=headers, content_type="application/octet-stream")
+
+    server.start("127.0.0.1", PORT)
+    stopping = threading.Event()
+
+    def serve():
+        while not stopping.is_set():
+            server.poll()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    failures = []
+
+    def check(condition, message):
+        print(f"  {'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    try:
+        for path, static_file in sorted(static_files.files.items()):
+            with open(static_file.path, "rb") as f:
+                expected = f.read()
+            response, body = fetch(path)
+            check(response.status == 200 and body == expected, f"{path} {response.status} {len(body)} bytes")
+            etag = response.getheader("ETag")
+
+            if static_file.gzip_path is not None:
+                response, body = fetch(path, {"Accept-Encoding": "gzip"})
+                check(response.status == 200 and response.getheader("Content-Encoding") == "gzip"
+                      and gzip.decompress(body) == expected, f"{path} gzip {len(body)} bytes")
+
+            response, body = fetch(path, {"If-None-Match": etag})
+            check(response.status == 304 and not body, f"{path} If-None-Match {response.status}")
+
+        moves = bytearray((4, 0, 8, 2, 6, 1, 3, 5, 7))
+        game_log.add_game("X", moves, 5, RESULT_X_WINS, 0)
+        game_log.add_game("O", moves, 9, RESULT_DRAW, 1)
+        response, body = fetch("/api/games/log")
+        records = []
+        offset = 0
+        decoded = bytearray(9)
+        while offset < len(body):
+            size, header = decode_record(body, offset, len(body), decoded)
+            if size <= 0:
+                break
+            records.append((header & 0b11, body[offset + 1] >> 4))
+            offset += size
+        check(response.status == 200 and len(body) == game_log.log_size() and
+              records == [(RESULT_X_WINS, 5), (RESULT_DRAW, 9)],
+              f"/api/games/log {response.status} {len(body)} bytes, {len(records)} games")
+    finally:
+        stopping.set()
+        thread.join()
+        server.stop()
+
+    print(static_files.report())
+    if failures:
+        print(f"{len(failures)} checks failed")
+        return 1
+    print("all checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
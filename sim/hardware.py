@@ -0,0 +1,151 @@
+"""
+Simulated badge hardware shared by the stand-in modules in sim/stubs.
+
+The harness creates a Hardware instance and sets it as sim.hardware.current before code.py runs.
+The stand-in board, keypad, neopixel, microcontroller and adafruit_httpserver modules read their
+scripted input from it and record what code.py did to it.
+"""
+import time
+
+# Badger2040W panel size
+DISPLAY_WIDTH = 296
+DISPLAY_HEIGHT = 128
+
+# the UC8151 panel needs about a second between refreshes
+SECONDS_PER_FRAME = 1.0
+
+
+class SimulationDone(BaseException):
+    """
+    Raised from the stand-in hardware when the scripted session is over, to stop code.py.
+    A BaseException like KeyboardInterrupt, so the runtime's per step error handling lets it through.
+    """
+
+
+class VirtualEPaperDisplay:
+    """
+    Stand-in for board.DISPLAY, an EPaperDisplay that refuses refreshes sooner than seconds_per_frame apart.
+    """
+
+    def __init__(self, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT, seconds_per_frame=SECONDS_PER_FRAME):
+        self.width = width
+        self.height = height
+        self.seconds_per_frame = seconds_per_frame
+        self.root_group = None
+        self.auto_refresh = False
+        self.last_refresh = None
+
+        # counters
+        self.refreshes = 0
+        self.refused_refreshes = 0
+
+    @property
+    def time_to_refresh(self):
+        if self.last_refresh is None:
+            return 0
+        return max(0.0, self.last_refresh + self.seconds_per_frame - time.monotonic())
+
+    @property
+    def busy(self):
+        return False
+
+    def refresh(self):
+        if self.time_to_refresh > 0:
+            self.refused_refreshes += 1
+            raise RuntimeError("Refresh too soon")
+        self.last_refresh = time.monotonic()
+        self.refreshes += 1
+
+
+class HttpExchange:
+    """
+    A scripted HTTP request and, once code.py has handled it, the response it got.
+    """
+
+    def __init__(self, at, method, path, headers=None, body=b""):
+        self.at = at
+        self.method = method
+        self.path = path
+        self.headers = headers or {}
+        self.body = body
+        self.status = None
+        self.response_headers = None
+        self.response_size = None
+        self.handled_at = None
+
+
+class Hardware:
+    """
+    Simulated state of one badge for one run of code.py.
+    """
+
+    def __init__(self, seconds_per_frame=SECONDS_PER_FRAME, nvm_size=4096, duration=5.0):
+        self.display = VirtualEPaperDisplay(seconds_per_frame=seconds_per_frame)
+        # erased flash reads as 0xff
+        self.nvm = bytearray(b"\xff" * nvm_size)
+        # dict saved through the foamyguy_nvm_helper stand-in, None when nothing was saved
+        self.nvm_helper_data = None
+        self.ipv4_address = "192.168.4.20"
+
+        # seconds after start() the simulation ends
+        self.duration = duration
+        self.start_time = None
+
+        # scripted input, sorted by time in seconds after start()
+        self.key_events = []
+        self.http_exchanges = []
+        # seconds each key event waited between being scripted and being read by code.py
+        self.key_latencies = []
+
+        # counters
+        self.pixel_shows = 0
+
+    def start(self):
+        self.start_time = time.monotonic()
+
+    def elapsed(self):
+        if self.start_time is None:
+            return 0
+        return time.monotonic() - self.start_time
+
+    def check_done(self):
+        if self.start_time is not None and self.elapsed() >= self.duration:
+            raise SimulationDone()
+
+    def press(self, at, key_number, hold=0.05):
+        """
+        script a press of a button at `at` seconds, released `hold` seconds later
+        """
+        self.key_events.append((at, key_number, True))
+        self.key_events.append((at + hold, key_number, False))
+        self.key_events.sort(key=lambda event: event[0])
+
+    def burst(self, at, keys):
+        """
+        script press and release events for keys all arriving at once, like a queue that filled up
+        while the main loop was busy
+        """
+        for key_number in keys:
+            self.key_events.append((at, key_number, True))
+            self.key_events.append((at, key_number, False))
+        self.key_events.sort(key=lambda event: event[0])
+
+    def chord(self, at, held_key, pressed_key, hold=0.05):
+        """
+        script holding held_key while pressing and releasing pressed_key
+        """
+        self.key_events.append((at, held_key, True))
+        self.key_events.append((at + hold, pressed_key, True))
+        self.key_events.append((at + hold * 2, pressed_key, False))
+        self.key_events.append((at + hold * 3, held_key, False))
+        self.key_events.sort(key=lambda event: event[0])
+
+    def request(self, at, method, path, headers=None, body=b""):
+        exchange = HttpExchange(at, method, path, headers, body)
+        self.http_exchanges.append(exchange)
+        self.http_exchanges.sort(key=lambda exchange: exchange.at)
+        return exchange
+
+
+# the Hardware the stand-in modules use, set by the harness
+current = None
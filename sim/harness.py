@@ -0,0 +1,172 @@
+"""
+Runs code.py on a computer against simulated hardware.
+
+    from sim.hardware import Hardware
+    from sim.harness import Simulation
+
+    badge = Hardware(duration=5)
+    badge.chord(0.5, 2, 4)  # hold A and press C to start tic-tac-toe
+    result = Simulation(badge).run()
+
+code.py runs until the scripted session is over, then the stand-in keypad stops it by raising
+SimulationDone. The module globals of code.py are kept on the result so callers can inspect
+things like the refresh scheduler afterward.
+
+The game log is written to a temporary directory in place of sd/, unless a directory is given
+with sd_dir, so runs do not leave files in the repo or see games from earlier runs.
+"""
+import contextlib
+import gc
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sim import hardware
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+
+# free memory reported by the gc.mem_free() stand-in when nothing has been allocated,
+# roughly what a Pico W running code.py starts with
+HEAP_SIZE = 120 * 1024
+
+
+def _stub_module_names():
+    names = set()
+    for entry in os.listdir(STUBS_DIR):
+        if entry.endswith(".py"):
+            names.add(entry[:-3])
+        elif os.path.isdir(os.path.join(STUBS_DIR, entry)) and not entry.startswith("__"):
+            names.add(entry)
+    return names
+
+
+def _repo_module_names():
+    return {entry[:-3] for entry in os.listdir(REPO_ROOT) if entry.endswith(".py") and entry != "code.py"}
+
+
+def _mem_free():
+    if tracemalloc.is_tracing():
+        return HEAP_SIZE - tracemalloc.get_traced_memory()[0]
+    return HEAP_SIZE
+
+
+def _mem_alloc():
+    return HEAP_SIZE - _mem_free()
+
+
+class SimulationResult:
+    """
+    What happened during one run of code.py.
+    """
+
+    def __init__(self, badge):
+        self.hardware = badge
+        self.namespace = {}
+        self.output = ""
+        self.wall_time = 0
+        # step durations in seconds for each runtime task, by task name
+        self.step_times = {}
+        self.gc_collections = 0
+        self.allocated_blocks = 0
+        self.peak_memory = None
+        self.sd_dir = None
+
+
+class Simulation:
+    """
+    Runs code.py once against a Hardware instance.
+    """
+
+    def __init__(self, badge, seed=0, trace_memory=False, echo=False, sd_dir=None):
+        self.hardware = badge
+        self.seed = seed
+        # stands in for the badge's sd/ directory, a new temporary directory when None
+        self.sd_dir = sd_dir
+        # tracemalloc gives peak memory numbers but slows everything down a lot
+        self.trace_memory = trace_memory
+        # print code.py's output as it runs instead of only capturing it
+        self.echo = echo
+
+    def _prepare_modules(self):
+        for path in (REPO_ROOT, STUBS_DIR):
+            if path in sys.path:
+                sys.path.remove(path)
+        sys.path.insert(0, REPO_ROOT)
+        sys.path.insert(0, STUBS_DIR)
+
+        # every run gets fresh stand-ins bound to the current hardware, and fresh badge modules
+        for name in list(sys.modules):
+            top_level = name.split(".")[0]
+            if top_level in _stub_module_names() or top_level in _repo_module_names():
+                del sys.modules[name]
+
+        gc.mem_free = _mem_free
+        gc.mem_alloc = _mem_alloc
+
+    def _record_steps(self, result):
+        import badge_runtime  # pylint: disable=import-outside-toplevel
+
+        original_record = badge_runtime.RuntimeTask.record
+
+        def record(task, scheduled, started, finished):
+            # the runtime times steps in nanoseconds
+            result.step_times.setdefault(task.name, []).append((finished - started) / 1_000_000_000)
+            original_record(task, scheduled, started, finished)
+
+        badge_runtime.RuntimeTask.record = record
+
+    def _use_sd_dir(self, sd_dir):
+        import game_log  # pylint: disable=import-outside-toplevel
+
+        game_log.LOG_DIRECTORY = sd_dir
+
+    def run(self):
+        result = SimulationResult(self.hardware)
+        hardware.current = self.hardware
+        previous_cwd = os.getcwd()
+        os.chdir(REPO_ROOT)
+        temporary_sd = tempfile.TemporaryDirectory() if self.sd_dir is None else None
+        try:
+            self._prepare_modules()
+            self._record_steps(result)
+            result.sd_dir = self.sd_dir if temporary_sd is None else temporary_sd.name
+            self._use_sd_dir(result.sd_dir)
+            random.seed(self.seed)
+
+            with open("code.py", "r") as f:
+                code = compile(f.read(), "code.py", "exec")
+            result.namespace = {"__name__": "__main__", "__file__": "code.py"}
+
+            output = io.StringIO()
+            gc.collect()
+            collections_before = sum(stats["collections"] for stats in gc.get_stats())
+            blocks_before = sys.getallocatedblocks()
+            if self.trace_memory:
+                tracemalloc.start()
+
+            start = time.monotonic()
+            self.hardware.start()
+            redirect = contextlib.nullcontext() if self.echo else contextlib.redirect_stdout(output)
+            with redirect:
+                try:
+                    exec(code, result.namespace)  # pylint: disable=exec-used
+                except hardware.SimulationDone:
+                    pass
+            result.wall_time = time.monotonic() - start
+
+            if self.trace_memory:
+                result.peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            result.gc_collections = sum(stats["collections"] for stats in gc.get_stats()) - collections_before
+            result.allocated_blocks = sys.getallocatedblocks() - blocks_before
+            result.output = output.getvalue()
+        finally:
+            os.chdir(previous_cwd)
+            if temporary_sd is not None:
+                temporary_sd.cleanup()
+        return result
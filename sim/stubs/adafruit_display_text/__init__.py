@@ -0,0 +1,3 @@
+"""
+Stand-in for adafruit_display_text.
+"""
@@ -0,0 +1,35 @@
+"""
+Stand-in for adafruit_display_text.bitmap_label. Setting text does the allocation the real
+label does, a new bitmap sized for the text.
+"""
+import displayio
+
+
+class Label(displayio.Group):
+    def __init__(self, font, *, text="", color=0xffffff, scale=1, line_spacing=1.25, **kwargs):
+        super().__init__(scale=scale)
+        self.font = font
+        self.color = color
+        self.line_spacing = line_spacing
+        self.anchor_point = (0, 0)
+        self.anchored_position = (0, 0)
+        self.bitmap = None
+        self._text = None
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, text):
+        self._text = text
+        glyph_width, glyph_height = self.font.get_bounding_box()
+        lines = text.split("\n")
+        width = max(len(line) for line in lines) * glyph_width
+        height = int(len(lines) * glyph_height * self.line_spacing)
+        self.bitmap = displayio.Bitmap(max(width, 1), max(height, 1), 2)
+
+    @property
+    def bounding_box(self):
+        return 0, 0, self.bitmap.width, self.bitmap.height
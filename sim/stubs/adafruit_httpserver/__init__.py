@@ -0,0 +1,258 @@
+"""
+Stand-in for adafruit_httpserver. Instead of accepting sockets, Server.poll() handles the HTTP
+requests scripted on the simulated hardware and records each response on its HttpExchange.
+
+Requests have no socket (connection is None). sim/check_http.py runs the real library instead.
+"""
+import json
+import os
+
+from sim import hardware
+
+GET = "GET"
+POST = "POST"
+PUT = "PUT"
+DELETE = "DELETE"
+PATCH = "PATCH"
+HEAD = "HEAD"
+OPTIONS = "OPTIONS"
+
+NO_REQUEST = "no_request"
+REQUEST_HANDLED_RESPONSE_SENT = "request_handled_response_sent"
+
+
+class Status:
+    def __init__(self, code, text):
+        self.code = code
+        self.text = text
+
+    def __eq__(self, other):
+        return self.code == other.code
+
+    def __repr__(self):
+        return f'<Status {self.code}, "{self.text}">'
+
+
+OK_200 = Status(200, "OK")
+NO_CONTENT_204 = Status(204, "No Content")
+PARTIAL_CONTENT_206 = Status(206, "Partial Content")
+BAD_REQUEST_400 = Status(400, "Bad Request")
+NOT_FOUND_404 = Status(404, "Not Found")
+METHOD_NOT_ALLOWED_405 = Status(405, "Method Not Allowed")
+INTERNAL_SERVER_ERROR_500 = Status(500, "Internal Server Error")
+
+
+class Headers:
+    """
+    Case insensitive header storage.
+    """
+
+    def __init__(self, headers=None):
+        self._storage = {}
+        for name, value in (headers or {}).items():
+            self[name] = value
+
+    def get(self, name, default=None):
+        return self._storage.get(name.lower(), (None, default))[1]
+
+    def __getitem__(self, name):
+        return self._storage[name.lower()][1]
+
+    def __setitem__(self, name, value):
+        self._storage[name.lower()] = (name, value)
+
+    def __contains__(self, name):
+        return name.lower() in self._storage
+
+    def items(self):
+        return [(name, value) for name, value in self._storage.values()]
+
+
+class QueryParams:
+    def __init__(self, query_string):
+        self._storage = {}
+        for pair in query_string.split("&"):
+            if pair:
+                name, _, value = pair.partition("=")
+                self._storage[name] = value
+
+    def get(self, name, default=None):
+        return self._storage.get(name, default)
+
+    def __contains__(self, name):
+        return name in self._storage
+
+
+class Request:
+    def __init__(self, server, exchange):
+        self.server = server
+        self.method = exchange.method
+        path, _, query_string = exchange.path.partition("?")
+        self.path = path
+        self.query_params = QueryParams(query_string)
+        self.headers = Headers(exchange.headers)
+        self.body = exchange.body
+        self.client_address = ("192.168.4.100", 50000)
+        self.connection = None
+        self.exchange = exchange
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Response:
+    def __init__(self, request, body="", *, status=OK_200, headers=None, cookies=None, content_type=None):
+        self._request = request
+        self._body = body
+        self._status = status
+        self._headers = Headers(headers)
+        self._content_type = content_type or "text/plain"
+
+    def _send(self):
+        body = self._body.encode("utf-8") if isinstance(self._body, str) else bytes(self._body)
+        self._record(body)
+
+    def _record(self, body):
+        self._send_headers(len(body), self._content_type)
+        self._request.exchange.response_size = len(body)
+
+    def _send_headers(self, content_length=None, content_type=None):
+        exchange = self._request.exchange
+        exchange.status = self._status.code
+        headers = dict(self._headers.items())
+        headers.setdefault("Content-Type", content_type or self._content_type)
+        headers.setdefault("Content-Length", content_length)
+        headers.setdefault("Connection", "close")
+        exchange.response_headers = headers
+        exchange.response_size = 0
+        global _sending
+        _sending = exchange
+
+    def _send_bytes(self, conn, buffer):
+        _sending.response_size += len(buffer)
+
+    def _close_connection(self):
+        pass
+
+
+class JSONResponse(Response):
+    def __init__(self, request, data, *, headers=None, status=OK_200):
+        super().__init__(request, json.dumps(data), headers=headers, status=status,
+                         content_type="application/json")
+
+
+class FileResponse(Response):
+    def __init__(self, request, filename="index.html", root_path=None, *, status=OK_200, headers=None,
+                 content_type=None, as_attachment=False, download_filename=None, buffer_size=1024,
+                 head_only=False, safe=True):
+        super().__init__(request, status=status, headers=headers, content_type=content_type)
+        root_path = root_path or request.server.root_path
+        self._path = (root_path + "/" + filename).lstrip("/")
+        self._head_only = head_only
+
+    def _send(self):
+        with open(self._path, "rb") as f:
+            body = f.read()
+        self._record(b"" if self._head_only else body)
+
+
+class ChunkedResponse(Response):
+    def __init__(self, request, body, *, status=OK_200, headers=None, cookies=None, content_type=None):
+        super().__init__(request, status=status, headers=headers, content_type=content_type)
+        self._chunks = body
+
+    def _send(self):
+        self._record(b"".join(chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                              for chunk in self._chunks()))
+
+
+class SSEResponse(Response):
+    def __init__(self, request, headers=None):
+        super().__init__(request, headers=headers, content_type="text/event-stream")
+        self.events = []
+        self.closed = False
+        request.exchange.events = self.events
+
+    def send_event(self, data, event=None, id=None, retry=None, custom_fields=None):  # pylint: disable=redefined-builtin
+        if self.closed:
+            raise BrokenPipeError(32)
+        self.events.append((event, data))
+
+    def close(self):
+        self.closed = True
+
+
+class Redirect(Response):
+    def __init__(self, request, url, *, permanent=False, preserve_method=False, status=None, headers=None):
+        super().__init__(request, status=status or Status(302, "Found"), headers=headers)
+        self._headers["Location"] = url
+
+
+class Route:
+    def __init__(self, path, methods=GET, handler=None, *, append_slash=False):
+        self.path = path
+        self.methods = methods if isinstance(methods, (set, list, tuple)) else (methods,)
+        self.handler = handler
+
+    def matches(self, method, path):
+        return path == self.path and method in self.methods
+
+
+def as_route(path, methods=GET, *, append_slash=False):
+    def decorator(handler):
+        return Route(path, methods, handler, append_slash=append_slash)
+    return decorator
+
+
+# exchange the response being sent belongs to
+_sending = None
+
+
+class Server:
+    def __init__(self, socket_source, root_path=None, *, https=False, certfile=None, keyfile=None, debug=False):
+        self.root_path = root_path
+        self.debug = debug
+        self.socket_timeout = 1
+        self.headers = Headers()
+        self._routes = []
+        self._next = 0
+        self.stopped = True
+
+    def route(self, path, methods=GET, *, append_slash=False):
+        def decorator(handler):
+            self._routes.append(Route(path, methods, handler))
+            return handler
+        return decorator
+
+    def add_routes(self, routes):
+        self._routes.extend(routes)
+
+    def start(self, host="0.0.0.0", port=5000):
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def poll(self):
+        current = hardware.current
+        if self._next >= len(current.http_exchanges) or current.http_exchanges[self._next].at > current.elapsed():
+            return NO_REQUEST
+        exchange = current.http_exchanges[self._next]
+        self._next += 1
+        request = Request(self, exchange)
+
+        response = None
+        for route in self._routes:
+            if route.matches(request.method, request.path):
+                response = route.handler(request)
+                break
+        else:
+            static_path = ((self.root_path or "") + request.path).lstrip("/")
+            if self.root_path is not None and request.method == GET and os.path.isfile(static_path):
+                response = FileResponse(request, request.path)
+            else:
+                response = Response(request, "Not Found", status=NOT_FOUND_404)
+
+        response._send()  # pylint: disable=protected-access
+        exchange.handled_at = current.elapsed()
+        return REQUEST_HANDLED_RESPONSE_SENT
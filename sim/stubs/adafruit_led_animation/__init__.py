@@ -0,0 +1,8 @@
+"""
+Stand-in for adafruit_led_animation.
+"""
+import time
+
+
+def monotonic_ms():
+    return int(time.monotonic() * 1000)
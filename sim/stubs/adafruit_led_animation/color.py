@@ -0,0 +1,24 @@
+"""
+Stand-in for adafruit_led_animation.color.
+"""
+RED = (255, 0, 0)
+YELLOW = (255, 150, 0)
+ORANGE = (255, 40, 0)
+GREEN = (0, 255, 0)
+CYAN = (0, 255, 255)
+BLUE = (0, 0, 255)
+PURPLE = (180, 0, 255)
+MAGENTA = (255, 0, 20)
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+
+def colorwheel(pos):
+    pos = int(pos) % 256
+    if pos < 85:
+        return (255 - pos * 3) << 16 | (pos * 3) << 8
+    if pos < 170:
+        pos -= 85
+        return (pos * 3) << 8 | (255 - pos * 3)
+    pos -= 170
+    return (pos * 3) << 16 | (255 - pos * 3)
@@ -0,0 +1,18 @@
+"""
+Stand-in for bitmaptools with readinto() for 1-bit packed rows.
+"""
+
+
+def readinto(bitmap, file, bits_per_pixel, element_size=1, reverse_pixels_in_element=False,
+             swap_bytes_in_element=False, reverse_rows=False):
+    # like CircuitPython, the first pixel of each byte is its least significant bit unless
+    # reverse_pixels_in_element is set
+    if bits_per_pixel != 1 or element_size != 1 or swap_bytes_in_element:
+        raise NotImplementedError("only 1 bit per pixel is simulated")
+    row_size = (bitmap.width + 7) // 8
+    for row in range(bitmap.height):
+        data = file.read(row_size)
+        y = bitmap.height - 1 - row if reverse_rows else row
+        for x in range(bitmap.width):
+            shift = 7 - x % 8 if reverse_pixels_in_element else x % 8
+            bitmap[x, y] = (data[x // 8] >> shift) & 1
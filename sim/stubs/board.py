@@ -0,0 +1,24 @@
+"""
+Stand-in for the Badger2040W board module.
+"""
+from sim import hardware
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"board.{self.name}"
+
+
+SDA = Pin("SDA")
+SCL = Pin("SCL")
+SW_UP = Pin("SW_UP")
+SW_DOWN = Pin("SW_DOWN")
+SW_A = Pin("SW_A")
+SW_B = Pin("SW_B")
+SW_C = Pin("SW_C")
+ENABLE_DIO = Pin("ENABLE_DIO")
+
+DISPLAY = hardware.current.display
@@ -0,0 +1,143 @@
+"""
+Stand-in for displayio. Objects keep their properties but nothing is rendered.
+"""
+import os
+import struct
+
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+    def make_transparent(self, index):
+        self._transparent.add(index)
+
+    def make_opaque(self, index):
+        self._transparent.discard(index)
+
+
+class ColorConverter:
+    def convert(self, color):
+        return color
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._data = bytearray(width * height)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        self._data[index] = value
+
+    def fill(self, value):
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+
+class OnDiskBitmap:
+    """
+    Reads the size from the BMP header. Like the FAT filesystem on the badge, file names are
+    matched case insensitively.
+    """
+
+    def __init__(self, filename):
+        with open(_find_file(filename), "rb") as f:
+            header = f.read(26)
+        self.width, height = struct.unpack("<ii", header[18:26])
+        self.height = abs(height)
+        self.pixel_shader = Palette(2)
+
+
+def _find_file(filename):
+    directory, name = os.path.split(filename)
+    for entry in os.listdir(directory or "."):
+        if entry.lower() == name.lower():
+            return os.path.join(directory, entry)
+    raise OSError(2, "No such file/directory", filename)
+
+
+class TileGrid:
+    def __init__(self, bitmap, pixel_shader, width=1, height=1, tile_width=None, tile_height=None,
+                 default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width if tile_width is not None else bitmap.width
+        self.tile_height = tile_height if tile_height is not None else bitmap.height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+        self._tiles = bytearray([default_tile] * (width * height))
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        return self._tiles[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        self._tiles[index] = value
+
+
+class Group:
+    def __init__(self, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._layers = []
+
+    def append(self, layer):
+        self._layers.append(layer)
+
+    def insert(self, index, layer):
+        self._layers.insert(index, layer)
+
+    def remove(self, layer):
+        self._layers.remove(layer)
+
+    def pop(self, index=-1):
+        return self._layers.pop(index)
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        self._layers[index] = layer
+
+    def __iter__(self):
+        return iter(self._layers)
+
+
+def release_displays():
+    pass
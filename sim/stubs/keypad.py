@@ -0,0 +1,90 @@
+"""
+Stand-in for keypad that replays the key events scripted on the simulated hardware.
+"""
+from sim import hardware
+
+_TICKS_MAX = (1 << 29) - 1
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __eq__(self, other):
+        return self.key_number == other.key_number and self.pressed == other.pressed
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"<Event: key_number {self.key_number} {'pressed' if self.pressed else 'released'}>"
+
+
+class EventQueue:
+    def __init__(self):
+        self._next = 0
+        self.overflowed = False
+
+    def _due(self):
+        current = hardware.current
+        # the simulation ends from here once the session is over, like pulling the badge's battery
+        current.check_done()
+        if self._next < len(current.key_events) and current.key_events[self._next][0] <= current.elapsed():
+            return current.key_events[self._next]
+        return None
+
+    def _take(self, due):
+        current = hardware.current
+        self._next += 1
+        # how long the event sat in the queue, in seconds
+        current.key_latencies.append(current.elapsed() - due[0])
+        # ticks_ms() of when the event was scripted to happen
+        return int((current.start_time + due[0]) * 1000) & _TICKS_MAX
+
+    def get(self):
+        due = self._due()
+        if due is None:
+            return None
+        return Event(due[1], due[2], self._take(due))
+
+    def get_into(self, event):
+        due = self._due()
+        if due is None:
+            return False
+        event.timestamp = self._take(due)
+        event.key_number = due[1]
+        event.pressed = due[2]
+        return True
+
+    def clear(self):
+        self._next = len(hardware.current.key_events)
+
+    def __len__(self):
+        current = hardware.current
+        count = 0
+        for at, _, _ in current.key_events[self._next:]:
+            if at > current.elapsed():
+                break
+            count += 1
+        return count
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class Keys:
+    def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.02, max_events=64):
+        self.key_count = len(pins)
+        self.events = EventQueue()
+
+    def reset(self):
+        pass
+
+    def deinit(self):
+        pass
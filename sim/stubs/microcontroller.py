@@ -0,0 +1,6 @@
+"""
+Stand-in for microcontroller, only nvm is provided.
+"""
+from sim import hardware
+
+nvm = hardware.current.nvm
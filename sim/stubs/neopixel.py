@@ -0,0 +1,70 @@
+"""
+Stand-in for neopixel that counts writes to the strip.
+"""
+from sim import hardware
+
+GRB = "GRB"
+GRBW = "GRBW"
+RGB = "RGB"
+
+
+class NeoPixel:
+    def __init__(self, pin, n, *, bpp=3, brightness=1.0, auto_write=True, pixel_order=None):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.auto_write = auto_write
+        self._brightness = brightness
+        self._pixels = [(0, 0, 0)] * n
+        self.buf = bytearray(n * bpp)
+
+    def __len__(self):
+        return self.n
+
+    @staticmethod
+    def _to_tuple(color):
+        if isinstance(color, int):
+            return (color >> 16) & 0xff, (color >> 8) & 0xff, color & 0xff
+        return tuple(color)
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            for i, value in zip(range(*index.indices(self.n)), color):
+                self._pixels[i] = self._to_tuple(value)
+        else:
+            self._pixels[index] = self._to_tuple(color)
+        if self.auto_write:
+            self.show()
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def fill(self, color):
+        color = self._to_tuple(color)
+        for i in range(self.n):
+            self._pixels[i] = color
+        if self.auto_write:
+            self.show()
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, value):
+        self._brightness = min(max(value, 0.0), 1.0)
+        if self.auto_write:
+            self.show()
+
+    def show(self):
+        offset = 0
+        for red, green, blue in self._pixels:
+            # GRB order like the badge strip
+            self.buf[offset] = int(green * self._brightness)
+            self.buf[offset + 1] = int(red * self._brightness)
+            self.buf[offset + 2] = int(blue * self._brightness)
+            offset += self.bpp
+        hardware.current.pixel_shows += 1
+
+    def deinit(self):
+        pass
@@ -0,0 +1,8 @@
+"""
+Stand-in for neopixel_write that counts writes to the strip.
+"""
+from sim import hardware
+
+
+def neopixel_write(digitalinout, buf):
+    hardware.current.pixel_shows += 1
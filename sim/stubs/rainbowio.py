@@ -0,0 +1,14 @@
+"""
+Stand-in for the rainbowio built in module.
+"""
+
+
+def colorwheel(color_value):
+    color_value = int(color_value) & 0xff
+    if color_value < 85:
+        return (255 - color_value * 3) << 16 | (color_value * 3) << 8
+    if color_value < 170:
+        color_value -= 85
+        return (color_value * 3) << 8 | (255 - color_value * 3)
+    color_value -= 170
+    return (color_value * 3) << 16 | (255 - color_value * 3)
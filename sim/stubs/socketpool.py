@@ -0,0 +1,16 @@
+"""
+Stand-in for socketpool. The stand-in adafruit_httpserver does not use sockets, and UDP sockets
+for the badge link are the computer's own, so a simulated badge can play one on the same computer.
+"""
+import socket as _socket
+
+
+class SocketPool:
+    AF_INET = _socket.AF_INET
+    SOCK_DGRAM = _socket.SOCK_DGRAM
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    def socket(self, family=AF_INET, type=SOCK_DGRAM):  # pylint: disable=redefined-builtin
+        return _socket.socket(family, type)
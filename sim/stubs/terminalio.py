@@ -0,0 +1,38 @@
+"""
+Stand-in for terminalio with the 6x12 built in font metrics and a glyph tile strip for
+printable ASCII.
+"""
+import displayio
+
+GLYPH_WIDTH = 6
+GLYPH_HEIGHT = 12
+FIRST_GLYPH = 0x20
+GLYPH_COUNT = 0x7f - FIRST_GLYPH
+
+
+class Glyph:
+    def __init__(self, bitmap, tile_index, width, height, dx, dy, shift_x, shift_y):
+        self.bitmap = bitmap
+        self.tile_index = tile_index
+        self.width = width
+        self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.shift_x = shift_x
+        self.shift_y = shift_y
+
+
+class BuiltinFont:
+    def __init__(self):
+        self.bitmap = displayio.Bitmap(GLYPH_WIDTH * GLYPH_COUNT, GLYPH_HEIGHT, 2)
+
+    def get_bounding_box(self):
+        return GLYPH_WIDTH, GLYPH_HEIGHT
+
+    def get_glyph(self, codepoint):
+        if not FIRST_GLYPH <= codepoint < FIRST_GLYPH + GLYPH_COUNT:
+            return None
+        return Glyph(self.bitmap, codepoint - FIRST_GLYPH, GLYPH_WIDTH, GLYPH_HEIGHT, 0, 0, GLYPH_WIDTH, 0)
+
+
+FONT = BuiltinFont()
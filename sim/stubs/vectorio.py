@@ -0,0 +1,40 @@
+"""
+Stand-in for vectorio shapes.
+"""
+
+
+class VectorShape:
+    def __init__(self, pixel_shader, x=0, y=0):
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+
+class Rectangle(VectorShape):
+    def __init__(self, pixel_shader, width, height, x=0, y=0):
+        super().__init__(pixel_shader, x, y)
+        self.width = width
+        self.height = height
+
+
+class Circle(VectorShape):
+    def __init__(self, pixel_shader, radius, x=0, y=0):
+        super().__init__(pixel_shader, x, y)
+        self.radius = radius
+
+
+class Polygon(VectorShape):
+    def __init__(self, pixel_shader, points, x=0, y=0):
+        super().__init__(pixel_shader, x, y)
+        self.points = points
+
+    @property
+    def points(self):
+        return list(self._points)
+
+    @points.setter
+    def points(self, points):
+        if len(points) < 3:
+            raise ValueError("Polygon needs at least 3 points")
+        self._points = list(points)
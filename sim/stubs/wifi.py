@@ -0,0 +1,13 @@
+"""
+Stand-in for wifi, the radio is always connected.
+"""
+from sim import hardware
+
+
+class Radio:
+    @property
+    def ipv4_address(self):
+        return hardware.current.ipv4_address
+
+
+radio = Radio()
@@ -0,0 +1,57 @@
+"""
+1-bit sprite atlas with every tile the tic-tac-toe board needs.
+
+sprites.bmp is made from selector.bmp, x.bmp and o.bmp by tools/pack_sprites.py. It is one row
+of TILE_SIZE square tiles: blank, selector, X, X with the selector, O and O with the selector.
+The tile of a cell is the tile of its piece plus TILE_SELECTOR when the selector is on it, so the
+whole board is a single 3x3 TileGrid.
+
+The atlas can be read into a RAM Bitmap once, 1600 bytes, or used as an OnDiskBitmap that is
+read from flash whenever the display draws it.
+"""
+import struct
+
+ATLAS_FILE = "sprites.bmp"
+
+# tiles are square with the 30 pixel sprites in their top left corner
+TILE_SIZE = 40
+# width of the atlas in tiles, it has room for two more tiles. 8 tiles of 40 pixels are
+# 40 bytes per row of 1-bit pixels, so BMP rows need no padding.
+ATLAS_TILES = 8
+
+TILE_BLANK = 0
+TILE_SELECTOR = 1
+TILE_X = 2
+TILE_O = 4
+
+PIECE_TILES = {"X": TILE_X, "O": TILE_O}
+
+
+def load_atlas(filename=ATLAS_FILE, in_ram=True):
+    """
+    returns (bitmap, palette) for the atlas, with the background color transparent
+    """
+    # imported here so tools/pack_sprites.py can use the tile layout on a computer
+    import bitmaptools  # pylint: disable=import-outside-toplevel
+    import displayio  # pylint: disable=import-outside-toplevel
+
+    if not in_ram:
+        odb = displayio.OnDiskBitmap(filename)
+        odb.pixel_shader.make_transparent(0)
+        return odb, odb.pixel_shader
+
+    with open(filename, "rb") as f:
+        header = f.read(26)
+        pixel_offset = struct.unpack_from("<I", header, 10)[0]
+        width, height = struct.unpack_from("<ii", header, 18)
+        bitmap = displayio.Bitmap(width, abs(height), 2)
+        f.seek(pixel_offset)
+        # BMP rows are stored bottom up unless the height is negative, and each byte holds its
+        # first pixel in the most significant bit, where readinto() expects the least significant
+        bitmaptools.readinto(bitmap, f, 1, reverse_pixels_in_element=True, reverse_rows=height > 0)
+
+    palette = displayio.Palette(2)
+    palette[0] = 0xffffff
+    palette[1] = 0x000000
+    palette.make_transparent(0)
+    return bitmap, palette
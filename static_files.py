@@ -0,0 +1,160 @@
+"""
+Static file serving for the files in static/.
+
+Files are streamed from flash through one reused buffer, so sending a file allocates the same
+small amount however big it is. When the client accepts gzip, the copy made ahead of time by
+tools/build_static.py is sent instead. Responses carry an ETag and a long Cache-Control max-age,
+and revalidations with a matching If-None-Match get 304 Not Modified. Like every other response
+from adafruit_httpserver, the connection is closed after it.
+
+The streaming uses internals of adafruit_httpserver 4.x: Response._send(), _send_headers(),
+_send_bytes() and _close_connection(). sim/check_http.py serves files through the real library
+over real sockets to check them.
+"""
+import binascii
+import os
+
+from adafruit_httpserver import Response, Status, OK_200, GET
+
+from response_cache import etag_matches
+
+NOT_MODIFIED_304 = Status(304, "Not Modified")
+
+MIME_TYPES = {
+    "html": "text/html",
+    "css": "text/css",
+    "js": "application/javascript",
+    "json": "application/json",
+    "txt": "text/plain",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "ico": "image/x-icon",
+}
+
+
+class StaticFile:
+    """
+    A file in the static directory, with the size and ETag of it and of its gzip copy.
+    Sizes and ETags are worked out the first time the file is requested.
+    """
+
+    def __init__(self, path, content_type, gzip_path=None):
+        self.path = path
+        self.content_type = content_type
+        self.gzip_path = gzip_path
+        self.size = None
+        self.etag = None
+        self.gzip_size = None
+        self.gzip_etag = None
+
+
+class StaticFileResponse(Response):
+    """
+    Sends a static file in buffer sized chunks, or only the headers for 304 Not Modified.
+    """
+
+    def __init__(self, request, static_files, path, size, *, status, headers, content_type):
+        super().__init__(request, status=status, headers=headers, content_type=content_type)
+        self._static_files = static_files
+        self._path = path
+        self._size = size
+
+    def _send(self):
+        self._send_headers(self._size, self._content_type)
+        if self._path is not None:
+            self._static_files.stream(self, self._request.connection, self._path)
+        self._close_connection()
+
+
+class StaticFiles:
+    """
+    Adds a GET route for every file in root.
+    """
+
+    def __init__(self, server, root, buffer_size=1024, max_age=86400):
+        self.server = server
+        self.root = root
+        self.max_age = max_age
+
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+
+        self.files = {}
+        names = os.listdir(root)
+        for name in names:
+            if name.endswith(".gz") or name.startswith("."):
+                continue
+            gzip_path = f"{root}/{name}.gz" if f"{name}.gz" in names else None
+            extension = name.rsplit(".", 1)[-1].lower()
+            self.files["/" + name] = StaticFile(f"{root}/{name}", MIME_TYPES.get(extension, "application/octet-stream"),
+                                                gzip_path)
+            server.route("/" + name, GET)(self.handle)
+
+        # counters
+        self.served = 0
+        self.gzip_served = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def _describe(self, path):
+        """
+        returns (size, ETag) of a file, reading it once through the buffer for its CRC
+        """
+        size = 0
+        crc = 0
+        with open(path, "rb") as f:
+            while True:
+                count = f.readinto(self._buffer)
+                if not count:
+                    break
+                size += count
+                crc = binascii.crc32(self._view[:count], crc)
+        return size, f'"{crc:08x}-{size:x}"'
+
+    def handle(self, request):
+        """
+        route handler for the static files
+        """
+        static_file = self.files[request.path]
+        if static_file.etag is None:
+            static_file.size, static_file.etag = self._describe(static_file.path)
+            if static_file.gzip_path is not None:
+                static_file.gzip_size, static_file.gzip_etag = self._describe(static_file.gzip_path)
+
+        headers = {"Cache-Control": f"public, max-age={self.max_age}"}
+        path, size, etag = static_file.path, static_file.size, static_file.etag
+        use_gzip = False
+        if static_file.gzip_path is not None:
+            headers["Vary"] = "Accept-Encoding"
+            if "gzip" in (request.headers.get("Accept-Encoding") or ""):
+                use_gzip = True
+                path, size, etag = static_file.gzip_path, static_file.gzip_size, static_file.gzip_etag
+                headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = etag
+
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            self.not_modified += 1
+            return StaticFileResponse(request, self, None, 0, status=NOT_MODIFIED_304, headers=headers,
+                                      content_type=static_file.content_type)
+
+        self.served += 1
+        if use_gzip:
+            self.gzip_served += 1
+        return StaticFileResponse(request, self, path, size, status=OK_200, headers=headers,
+                                  content_type=static_file.content_type)
+
+    def stream(self, response, connection, path):
+        """
+        send the file at path through response in buffer sized chunks
+        """
+        with open(path, "rb") as f:
+            while True:
+                count = f.readinto(self._buffer)
+                if not count:
+                    break
+                response._send_bytes(connection, self._view[:count])  # pylint: disable=protected-access
+                self.bytes_sent += count
+
+    def report(self):
+        return (f"static files served: {self.served} gzip: {self.gzip_served} not modified: {self.not_modified} "
+                f"bytes: {self.bytes_sent}")
@@ -0,0 +1,102 @@
+"""
+Bitboard tic-tac-toe game logic.
+
+The board is held as two 9 bit masks, one for X and one for O. Bit n is the cell at
+column n % 3, row n // 3, so a board position [x, y] maps to bit y * 3 + x.
+"""
+
+FULL_BOARD = 0b111111111
+
+# win masks paired with the TicTacToeGame.winner_line_map keys they draw
+WIN_LINES = (
+    (0b000000111, "row-0"),
+    (0b000111000, "row-1"),
+    (0b111000000, "row-2"),
+    (0b001001001, "col-0"),
+    (0b010010010, "col-1"),
+    (0b100100100, "col-2"),
+    (0b100010001, "diag-tld"),
+    (0b001010100, "diag-bru"),
+)
+
+NO_LINE = 0xff
+
+# for every possible 9 bit mask, the index into WIN_LINES of the first line it contains, or NO_LINE
+LINE_FOR_MASK = bytearray(FULL_BOARD + 1)
+for _mask in range(FULL_BOARD + 1):
+    LINE_FOR_MASK[_mask] = NO_LINE
+    for _line_idx, _line in enumerate(WIN_LINES):
+        if _mask & _line[0] == _line[0]:
+            LINE_FOR_MASK[_mask] = _line_idx
+            break
+
+# number of set bits for every possible 9 bit mask
+BIT_COUNT = bytearray(FULL_BOARD + 1)
+for _mask in range(1, FULL_BOARD + 1):
+    BIT_COUNT[_mask] = BIT_COUNT[_mask >> 1] + (_mask & 1)
+
+# check_winner() return values, built once so checking a move does not allocate
+_X_RESULTS = tuple(("X", line[1]) for line in WIN_LINES)
+_O_RESULTS = tuple(("O", line[1]) for line in WIN_LINES)
+
+
+def cell_index(board_position):
+    """
+    convert a [x, y] board position into a cell index
+    """
+    return board_position[1] * 3 + board_position[0]
+
+
+class BitBoard:
+    """
+    Tic-tac-toe board state stored as one 9 bit mask per player.
+    """
+
+    def __init__(self):
+        self.x_mask = 0
+        self.o_mask = 0
+
+    def reset(self):
+        self.x_mask = 0
+        self.o_mask = 0
+
+    def play(self, piece, index):
+        if piece == "X":
+            self.x_mask |= 1 << index
+        else:
+            self.o_mask |= 1 << index
+
+    def is_empty(self, index):
+        return not (self.x_mask | self.o_mask) & (1 << index)
+
+    @property
+    def empty_mask(self):
+        return ~(self.x_mask | self.o_mask) & FULL_BOARD
+
+    @property
+    def empty_count(self):
+        return BIT_COUNT[self.empty_mask]
+
+    def nth_empty(self, n):
+        """
+        returns the cell index of the nth empty cell, counting from cell 0
+        """
+        empty = self.empty_mask
+        while n > 0:
+            # clear the lowest set bit
+            empty &= empty - 1
+            n -= 1
+        # index of the lowest set bit
+        return BIT_COUNT[(empty & -empty) - 1]
+
+    def check_winner(self):
+        """
+        returns (winner, line_key) if a player has three in a row, otherwise None
+        """
+        line_idx = LINE_FOR_MASK[self.x_mask]
+        if line_idx != NO_LINE:
+            return _X_RESULTS[line_idx]
+        line_idx = LINE_FOR_MASK[self.o_mask]
+        if line_idx != NO_LINE:
+            return _O_RESULTS[line_idx]
+        return None
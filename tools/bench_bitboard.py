@@ -0,0 +1,125 @@
+"""
+Micro-benchmark comparing the list based tic-tac-toe win check with the bitboard engine.
+
+Run from the repo root on a computer:
+
+    python3 tools/bench_bitboard.py
+
+The script only uses time.monotonic_ns() and random, so it can also be copied to the
+badge along with tictactoe_engine.py and run from the REPL.
+"""
+import random
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from tictactoe_engine import BitBoard, cell_index  # noqa: E402  pylint: disable=wrong-import-position
+
+ITERATIONS = 2000
+
+
+def list_check_winner(board_state):
+    """
+    the original list based TicTacToeGame.check_winner()
+    """
+    for row_idx, row in enumerate(board_state):
+        if row.count(row[0]) == 3 and row[0] != "":
+            return row[0], f"row-{row_idx}"
+    for col_idx in range(len(board_state)):
+        col = []
+        for row in board_state:
+            col.append(row[col_idx])
+        if col.count(col[0]) == 3 and col[0] != "":
+            return col[0], f"col-{col_idx}"
+    top_left_down = []
+    bottom_right_up = []
+    for i in range(3):
+        top_left_down.append(board_state[i][i])
+        bottom_right_up.append(board_state[2 - i][i])
+    if top_left_down.count(top_left_down[0]) == 3 and top_left_down[0] != "":
+        return top_left_down[0], "diag-tld"
+    if bottom_right_up.count(bottom_right_up[0]) == 3 and bottom_right_up[0] != "":
+        return bottom_right_up[0], "diag-bru"
+    return None
+
+
+def list_empty_spots(board_state):
+    """
+    the original list based TicTacToeGame.empty_spots property
+    """
+    empty_spots = []
+    for row in range(3):
+        for col in range(3):
+            if board_state[col][row] == "":
+                empty_spots.append([row, col])
+    return empty_spots
+
+
+def random_games(count):
+    """
+    returns a list of games, each a list of (piece, [x, y]) moves up to the first win
+    """
+    games = []
+    for _ in range(count):
+        bitboard = BitBoard()
+        turn = random.choice(("X", "O"))
+        moves = []
+        while bitboard.empty_count > 0:
+            idx = bitboard.nth_empty(random.randint(0, bitboard.empty_count - 1))
+            bitboard.play(turn, idx)
+            moves.append((turn, [idx % 3, idx // 3]))
+            if bitboard.check_winner():
+                break
+            turn = "X" if turn == "O" else "O"
+        games.append(moves)
+    return games
+
+
+def run_list(games):
+    results = []
+    start = time.monotonic_ns()
+    for moves in games:
+        board_state = [["", "", ""], ["", "", ""], ["", "", ""]]
+        for piece, position in moves:
+            board_state[position[1]][position[0]] = piece
+            list_empty_spots(board_state)
+            winner = list_check_winner(board_state)
+        results.append(winner)
+    return time.monotonic_ns() - start, results
+
+
+def run_bitboard(games):
+    results = []
+    bitboard = BitBoard()
+    start = time.monotonic_ns()
+    for moves in games:
+        bitboard.reset()
+        for piece, position in moves:
+            bitboard.play(piece, cell_index(position))
+            if bitboard.empty_count:
+                bitboard.nth_empty(0)
+            winner = bitboard.check_winner()
+        results.append(winner)
+    return time.monotonic_ns() - start, results
+
+
+def main():
+    games = random_games(ITERATIONS)
+    move_count = sum(len(moves) for moves in games)
+
+    list_ns, list_results = run_list(games)
+    bitboard_ns, bitboard_results = run_bitboard(games)
+
+    if list_results != bitboard_results:
+        print("MISMATCH between list and bitboard results")
+        sys.exit(1)
+
+    print(f"{ITERATIONS} games, {move_count} moves")
+    print(f"list:     {list_ns / move_count / 1000:8.2f} us per move")
+    print(f"bitboard: {bitboard_ns / move_count / 1000:8.2f} us per move")
+    print(f"speedup:  {list_ns / bitboard_ns:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measure BadgeRuntime scheduling latency on a computer with stand-in badge work.
+
+Run from the repo root:
+
+    python3 tools/bench_runtime.py
+
+The stand-in HTTP poll blocks for a while every so often, like a slow client does on the badge.
+The script reports how long the LED and button tasks were delayed, first for the original
+serial loop and then for the asyncio runtime.
+"""
+import random
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from badge_runtime import BadgeRuntime  # noqa: E402  pylint: disable=wrong-import-position
+
+DURATION = 3.0
+
+# chance that a server poll hits a slow client, and how long that client takes
+SLOW_CLIENT_CHANCE = 0.02
+SLOW_CLIENT_TIME = 0.04
+
+
+class StandInWork:
+    """
+    Stand-ins for server.poll(), button handling, animations.animate() and refresher.poll().
+    """
+
+    def __init__(self):
+        self.rng = random.Random(2024)
+
+    def server_poll(self):
+        if self.rng.random() < SLOW_CLIENT_CHANCE:
+            time.sleep(SLOW_CLIENT_TIME)
+
+    def handle_buttons(self):
+        pass
+
+    def animate(self):
+        # roughly the cost of computing and writing 8 pixels
+        sum(range(200))
+
+    def refresh_poll(self):
+        pass
+
+
+def gaps_report(name, times):
+    gaps = sorted(b - a for a, b in zip(times, times[1:]))
+    if not gaps:
+        return f"{name}: no samples"
+    p50 = gaps[len(gaps) // 2]
+    p99 = gaps[int(len(gaps) * 0.99)]
+    return (f"{name}: {len(times)} calls, gap p50: {p50 * 1000:.1f}ms "
+            f"p99: {p99 * 1000:.1f}ms max: {gaps[-1] * 1000:.1f}ms")
+
+
+def timed(step, times):
+    def wrapper():
+        times.append(time.monotonic())
+        step()
+    return wrapper
+
+
+def run_serial():
+    work = StandInWork()
+    animate_times = []
+    button_times = []
+    animate = timed(work.animate, animate_times)
+    handle_buttons = timed(work.handle_buttons, button_times)
+    end = time.monotonic() + DURATION
+    while time.monotonic() < end:
+        work.server_poll()
+        handle_buttons()
+        work.refresh_poll()
+        animate()
+        # the serial loop on the badge does not sleep, but it cannot spin faster than its work either
+        time.sleep(0.005)
+    print("serial loop")
+    print("  " + gaps_report("leds", animate_times))
+    print("  " + gaps_report("buttons", button_times))
+
+
+def run_runtime():
+    work = StandInWork()
+    animate_times = []
+    button_times = []
+    runtime = BadgeRuntime()
+    runtime.add_task("http", work.server_poll, interval=0.01, budget=0.05)
+    runtime.add_task("buttons", timed(work.handle_buttons, button_times), interval=0.01, budget=0.02)
+    runtime.add_task("leds", timed(work.animate, animate_times), interval=0.02, budget=0.01)
+    runtime.add_task("display", work.refresh_poll, interval=0.1, budget=0.1)
+    end = time.monotonic() + DURATION
+
+    def stop_when_done():
+        if time.monotonic() >= end:
+            runtime.stop()
+
+    runtime.add_task("stop", stop_when_done, interval=0.05, budget=0.01)
+    runtime.run()
+    print("asyncio runtime")
+    print("  " + gaps_report("leds", animate_times))
+    print("  " + gaps_report("buttons", button_times))
+    for line in runtime.report().split("\n"):
+        print("  " + line)
+
+
+def main():
+    run_serial()
+    run_runtime()
+
+
+if __name__ == "__main__":
+    main()
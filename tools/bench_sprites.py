@@ -0,0 +1,109 @@
+"""
+Compare display refresh time and memory of the game board sprites as separate OnDiskBitmaps,
+as the sprite atlas read from flash, and as the sprite atlas in RAM.
+
+This one runs on the badge. Copy it to the CIRCUITPY drive with sprite_atlas.py, sprites.bmp,
+selector.bmp, x.bmp and o.bmp, stop code.py with Ctrl-C and run it from the REPL:
+
+    import bench_sprites
+
+Each variant draws a board with every cell holding a piece and the selector on one of them, then
+times display.refresh(), which is where displayio renders the group and sends it to the panel.
+Before that the RAM atlas is compared pixel by pixel with sprites.bmp, to check the bit order
+load_atlas() reads it with.
+
+It has not been run on a badge yet. The bit order and the refresh times have only been checked in
+the simulator.
+"""
+import gc
+import struct
+import time
+
+import board
+import displayio
+
+from sprite_atlas import ATLAS_FILE, load_atlas, TILE_O, TILE_SELECTOR, TILE_SIZE, TILE_X
+
+REFRESHES = 3
+
+# cell positions used with the separate bitmaps
+LOCATIONS = ((7, 7), (45, 7), (85, 7), (7, 45), (45, 45), (85, 45), (7, 85), (45, 85), (85, 85))
+
+
+def separate_bitmaps():
+    group = displayio.Group()
+    selector_bmp = displayio.OnDiskBitmap("selector.bmp")
+    x_bmp = displayio.OnDiskBitmap("x.bmp")
+    o_bmp = displayio.OnDiskBitmap("o.bmp")
+    for cell, (x, y) in enumerate(LOCATIONS):
+        piece_bmp = x_bmp if cell % 2 else o_bmp
+        group.append(displayio.TileGrid(piece_bmp, pixel_shader=piece_bmp.pixel_shader, x=x, y=y))
+    selector_tg = displayio.TileGrid(selector_bmp, pixel_shader=selector_bmp.pixel_shader)
+    selector_tg.x, selector_tg.y = LOCATIONS[4]
+    group.append(selector_tg)
+    return group
+
+
+def atlas(in_ram):
+    group = displayio.Group()
+    bitmap, palette = load_atlas(in_ram=in_ram)
+    board_tg = displayio.TileGrid(bitmap, pixel_shader=palette, width=3, height=3,
+                                  tile_width=TILE_SIZE, tile_height=TILE_SIZE, x=6, y=6)
+    for cell in range(9):
+        board_tg[cell] = TILE_X if cell % 2 else TILE_O
+    board_tg[4] |= TILE_SELECTOR
+    group.append(board_tg)
+    return group
+
+
+def check_bit_order():
+    """
+    prints how many pixels of the RAM atlas differ from sprites.bmp read a bit at a time
+    """
+    bitmap, _ = load_atlas(in_ram=True)
+    with open(ATLAS_FILE, "rb") as f:
+        header = f.read(26)
+        pixel_offset = struct.unpack_from("<I", header, 10)[0]
+        width, height = struct.unpack_from("<ii", header, 18)
+        f.seek(pixel_offset)
+        row_bytes = (width + 31) // 32 * 4
+        row = bytearray(row_bytes)
+        wrong = 0
+        for file_row in range(abs(height)):
+            f.readinto(row)
+            y = abs(height) - 1 - file_row if height > 0 else file_row
+            for x in range(width):
+                if (row[x >> 3] >> (7 - (x & 7))) & 1 != bitmap[x, y]:
+                    wrong += 1
+    print(f"atlas bit order   {'ok' if not wrong else f'{wrong} pixels wrong'}")
+
+
+def wait_for_panel(display):
+    while display.time_to_refresh > 0 or display.busy:
+        time.sleep(0.05)
+
+
+def measure(name, build):
+    display = board.DISPLAY
+    display.root_group = displayio.Group()
+    gc.collect()
+    free_before = gc.mem_free()
+    group = build()
+    gc.collect()
+    used = free_before - gc.mem_free()
+
+    display.root_group = group
+    times = []
+    for _ in range(REFRESHES):
+        wait_for_panel(display)
+        start = time.monotonic_ns()
+        display.refresh()
+        times.append((time.monotonic_ns() - start) // 1000)
+    print(f"{name:18s} memory {used:6d} bytes  refresh {min(times) / 1000:8.1f}ms min "
+          f"{sum(times) / len(times) / 1000:8.1f}ms avg")
+
+
+check_bit_order()
+measure("separate bitmaps", separate_bitmaps)
+measure("atlas on disk", lambda: atlas(False))
+measure("atlas in RAM", lambda: atlas(True))
@@ -0,0 +1,39 @@
+"""
+Make the gzip copies of the files in static/ that static_files.py sends to clients accepting gzip.
+
+Run from the repo root on a computer after changing anything in static/, then copy the .gz
+files to the CIRCUITPY drive along with the originals:
+
+    python3 tools/build_static.py
+
+Copies that would not be smaller than the original are removed instead, so those files are
+always sent as they are.
+"""
+import gzip
+import os
+
+STATIC_DIR = "static"
+
+
+def main():
+    for name in sorted(os.listdir(STATIC_DIR)):
+        if name.endswith(".gz") or name.startswith("."):
+            continue
+        path = os.path.join(STATIC_DIR, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        # mtime=0 keeps the output, and so its ETag, the same for the same input
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        gzip_path = path + ".gz"
+        if len(compressed) < len(data):
+            with open(gzip_path, "wb") as f:
+                f.write(compressed)
+            print(f"{name}: {len(data)} -> {len(compressed)} bytes")
+        else:
+            if os.path.exists(gzip_path):
+                os.remove(gzip_path)
+            print(f"{name}: {len(data)} bytes, gzip would not be smaller")
+
+
+if __name__ == "__main__":
+    main()
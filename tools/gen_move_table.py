@@ -0,0 +1,122 @@
+"""
+Generate moves.bin, the perfect-play move table used by the single player mode.
+
+Run from the repo root on a computer, then copy moves.bin to the CIRCUITPY drive:
+
+    python3 tools/gen_move_table.py
+
+Every position reachable from an empty board, with either player starting, is solved with
+minimax and stored once per symmetry class. See move_table.py for the file format.
+"""
+import sys
+
+sys.path.insert(0, ".")
+
+# pylint: disable=wrong-import-position
+from move_table import (  # noqa: E402
+    MAGIC, OUTCOME_DRAW, OUTCOME_ILLEGAL, OUTCOME_LOSS, OUTCOME_WIN, canonical_key,
+)
+from tictactoe_engine import FULL_BOARD, LINE_FOR_MASK, NO_LINE  # noqa: E402
+
+OUTPUT_FILE = "moves.bin"
+
+# minimax values for the player to move
+VALUE_TO_OUTCOME = {-1: OUTCOME_LOSS, 0: OUTCOME_DRAW, 1: OUTCOME_WIN}
+
+_values = {}
+
+
+def is_finished(me_mask, them_mask):
+    return (LINE_FOR_MASK[me_mask] != NO_LINE or LINE_FOR_MASK[them_mask] != NO_LINE
+            or me_mask | them_mask == FULL_BOARD)
+
+
+def value(me_mask, them_mask):
+    """
+    minimax value of a position for the player to move: 1 win, 0 draw, -1 loss
+    """
+    cached = _values.get((me_mask, them_mask))
+    if cached is not None:
+        return cached
+
+    if LINE_FOR_MASK[them_mask] != NO_LINE:
+        # the opponent's last move won the game
+        result = -1
+    elif me_mask | them_mask == FULL_BOARD:
+        result = 0
+    else:
+        result = -1
+        for cell in range(9):
+            bit = 1 << cell
+            if (me_mask | them_mask) & bit:
+                continue
+            # after playing, it is the opponent's turn
+            result = max(result, -value(them_mask, me_mask | bit))
+    _values[(me_mask, them_mask)] = result
+    return result
+
+
+def move_outcomes(me_mask, them_mask):
+    outcomes = []
+    for cell in range(9):
+        bit = 1 << cell
+        if (me_mask | them_mask) & bit:
+            outcomes.append(OUTCOME_ILLEGAL)
+        else:
+            outcomes.append(VALUE_TO_OUTCOME[-value(them_mask, me_mask | bit)])
+    return outcomes
+
+
+def reachable_positions():
+    """
+    yields every unfinished (me_mask, them_mask) position reachable from an empty board
+    """
+    seen = set()
+    pending = [(0, 0)]
+    while pending:
+        me_mask, them_mask = pending.pop()
+        if (me_mask, them_mask) in seen or is_finished(me_mask, them_mask):
+            continue
+        seen.add((me_mask, them_mask))
+        yield me_mask, them_mask
+        for cell in range(9):
+            bit = 1 << cell
+            if not (me_mask | them_mask) & bit:
+                pending.append((them_mask, me_mask | bit))
+
+
+def build_table():
+    """
+    returns a dict of canonical position key to the list of 9 cell outcomes
+    """
+    table = {}
+    for me_mask, them_mask in reachable_positions():
+        key, permutation = canonical_key(me_mask, them_mask)
+        if key in table:
+            continue
+        # outcomes are stored for the canonical board, cell n there is permutation[n] here
+        outcomes = move_outcomes(me_mask, them_mask)
+        table[key] = [outcomes[permutation[cell]] for cell in range(9)]
+    return table
+
+
+def pack_table(table):
+    data = bytearray(MAGIC)
+    for key in sorted(table):
+        packed = 0
+        for cell, outcome in enumerate(table[key]):
+            packed |= outcome << (cell * 2)
+        data += bytes((key & 0xff, key >> 8, packed & 0xff, (packed >> 8) & 0xff, packed >> 16))
+    return data
+
+
+def main():
+    table = build_table()
+    data = pack_table(table)
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(data)
+    print(f"wrote {len(table)} positions, {len(data)} bytes to {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load test for the index page cache, run on a computer against a stand-in server.
+
+Run from the repo root:
+
+    python3 tools/load_test_index.py
+
+The stand-in server is single threaded and closes the connection after every response,
+like adafruit_httpserver on the badge. It serves static/index.html three ways and the
+script reports requests per second for each:
+
+    no-cache   format the template on every request, like index_handler used to
+    cache      serve the cached rendering from RenderCache
+    etag       clients send If-None-Match and get 304 Not Modified
+
+Requests per second are dominated by the HTTP handling of the stand-in server, so the time spent
+producing each body (rendering, or the cache lookup and ETag check) and the body bytes sent are
+reported separately. They are the part the cache changes. These are CPython numbers; the
+benefit on the badge has not been measured.
+"""
+import http.client
+import http.server
+import sys
+import threading
+import time
+
+sys.path.insert(0, ".")
+
+from response_cache import RenderCache  # noqa: E402  pylint: disable=wrong-import-position
+
+DURATION = 2.0
+CLIENTS = 8
+VALUES = ("#ff00ff", 12, 9)
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves the index page the way the badge does for the selected mode.
+    """
+
+    mode = "no-cache"
+    template = None
+    cache = None
+    # seconds spent producing bodies, and body bytes sent
+    body_time = 0
+    body_bytes = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        started = time.perf_counter()
+        if self.mode == "no-cache":
+            status, body, headers = 200, self.template.format(*VALUES).encode("utf-8"), {}
+        else:
+            body = self.cache.render(*VALUES)
+            headers = {"ETag": self.cache.etag, "Cache-Control": "no-cache"}
+            if self.cache.matches(self.headers.get("If-None-Match")):
+                status, body = 304, b""
+            else:
+                status = 200
+        StandInHandler.body_time += time.perf_counter() - started
+        StandInHandler.body_bytes += len(body)
+        self._send(status, body, headers)
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def client(port, use_etag, end, counts, index):
+    etag = None
+    while time.monotonic() < end:
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        headers = {}
+        if use_etag and etag is not None:
+            headers["If-None-Match"] = etag
+        connection.request("GET", "/", headers=headers)
+        response = connection.getresponse()
+        response.read()
+        etag = response.getheader("ETag")
+        connection.close()
+        counts[index] += 1
+
+
+def run(mode, template):
+    StandInHandler.mode = mode
+    StandInHandler.template = template
+    StandInHandler.cache = RenderCache(template)
+    StandInHandler.body_time = 0
+    StandInHandler.body_bytes = 0
+    server = http.server.HTTPServer(("127.0.0.1", 0), StandInHandler)
+    port = server.server_address[1]
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    counts = [0] * CLIENTS
+    end = time.monotonic() + DURATION
+    threads = [threading.Thread(target=client, args=(port, mode == "etag", end, counts, i))
+               for i in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    server.server_close()
+
+    total = sum(counts)
+    print(f"{mode:9s} {total / DURATION:8.1f} requests/s  body {StandInHandler.body_time / total * 1e6:5.1f}us "
+          f"{StandInHandler.body_bytes / total:5.0f} bytes per request  {StandInHandler.cache.report()}")
+
+
+def main():
+    with open("static/index.html", "r") as f:
+        template = f.read()
+    for mode in ("no-cache", "cache", "etag"):
+        run(mode, template)
+
+
+if __name__ == "__main__":
+    main()
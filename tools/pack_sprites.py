@@ -0,0 +1,125 @@
+"""
+Pack the game sprites into sprites.bmp, the 1-bit atlas read by sprite_atlas.py.
+
+Run from the repo root on a computer, then copy sprites.bmp to the CIRCUITPY drive:
+
+    python3 tools/pack_sprites.py
+
+Reads selector.bmp, x.bmp and o.bmp (1-bit palette or 24-bit BMPs), turns dark pixels into ink
+and writes one row of tiles: blank, selector, X, X with the selector, O and O with the selector.
+No image libraries are needed.
+"""
+import struct
+import sys
+
+sys.path.insert(0, ".")
+
+# pylint: disable=wrong-import-position
+from sprite_atlas import ATLAS_FILE, ATLAS_TILES, TILE_O, TILE_SELECTOR, TILE_SIZE, TILE_X  # noqa: E402
+
+# colors darker than this are ink
+INK_THRESHOLD = 128
+
+
+def read_bmp(filename):
+    """
+    returns (width, height, rows) where rows[y][x] is True for ink, top row first
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if data[:2] != b"BM":
+        raise ValueError(f"{filename} is not a BMP file")
+    pixel_offset = struct.unpack_from("<I", data, 10)[0]
+    header_size, width, height, _, bits_per_pixel, compression = struct.unpack_from("<IiiHHI", data, 14)
+    if compression != 0:
+        raise ValueError(f"{filename}: compressed BMPs are not supported")
+
+    palette = []
+    if bits_per_pixel <= 8:
+        color_count = struct.unpack_from("<I", data, 46)[0] or 1 << bits_per_pixel
+        for index in range(color_count):
+            blue, green, red = data[14 + header_size + index * 4:14 + header_size + index * 4 + 3]
+            palette.append((red, green, blue))
+
+    row_size = (width * bits_per_pixel + 31) // 32 * 4
+    rows = []
+    for row in range(abs(height)):
+        # bottom up unless the height is negative
+        stored_row = abs(height) - 1 - row if height > 0 else row
+        start = pixel_offset + stored_row * row_size
+        pixels = []
+        for x in range(width):
+            if bits_per_pixel == 24:
+                blue, green, red = data[start + x * 3:start + x * 3 + 3]
+            elif bits_per_pixel in (1, 4, 8):
+                bit = x * bits_per_pixel
+                index = (data[start + bit // 8] >> (8 - bits_per_pixel - bit % 8)) & ((1 << bits_per_pixel) - 1)
+                red, green, blue = palette[index]
+            else:
+                raise ValueError(f"{filename}: {bits_per_pixel} bits per pixel is not supported")
+            pixels.append((red * 30 + green * 59 + blue * 11) // 100 < INK_THRESHOLD)
+        rows.append(pixels)
+    return width, abs(height), rows
+
+
+def write_atlas(filename, tiles):
+    """
+    write tiles, a dict of tile index to rows of ink flags, as a 1-bit BMP of ATLAS_TILES tiles
+    """
+    width = TILE_SIZE * ATLAS_TILES
+    height = TILE_SIZE
+    row_size = (width + 31) // 32 * 4
+    pixel_offset = 14 + 40 + 2 * 4
+
+    pixels = bytearray(row_size * height)
+    for tile, rows in tiles.items():
+        for y, row in enumerate(rows):
+            # BMP rows are stored bottom up
+            start = (height - 1 - y) * row_size
+            for x, ink in enumerate(row):
+                if ink:
+                    column = tile * TILE_SIZE + x
+                    pixels[start + column // 8] |= 0x80 >> (column % 8)
+
+    with open(filename, "wb") as f:
+        f.write(b"BM")
+        f.write(struct.pack("<IHHI", pixel_offset + len(pixels), 0, 0, pixel_offset))
+        f.write(struct.pack("<IiiHHIIiiII", 40, width, height, 1, 1, 0, len(pixels), 2835, 2835, 2, 2))
+        # palette index 0 is the white background, 1 is black ink
+        f.write(bytes((0xff, 0xff, 0xff, 0, 0, 0, 0, 0)))
+        f.write(pixels)
+
+
+def tile_rows(*sprites):
+    """
+    returns TILE_SIZE rows with the ink of all sprites combined in the top left corner
+    """
+    rows = [[False] * TILE_SIZE for _ in range(TILE_SIZE)]
+    for width, height, sprite_rows in sprites:
+        if width > TILE_SIZE or height > TILE_SIZE:
+            raise ValueError(f"sprites must fit in {TILE_SIZE}x{TILE_SIZE} tiles")
+        for y in range(height):
+            for x in range(width):
+                rows[y][x] = rows[y][x] or sprite_rows[y][x]
+    return rows
+
+
+def main():
+    selector = read_bmp("selector.bmp")
+    x_piece = read_bmp("x.bmp")
+    o_piece = read_bmp("o.bmp")
+
+    tiles = {
+        TILE_SELECTOR: tile_rows(selector),
+        TILE_X: tile_rows(x_piece),
+        TILE_X + TILE_SELECTOR: tile_rows(x_piece, selector),
+        TILE_O: tile_rows(o_piece),
+        TILE_O + TILE_SELECTOR: tile_rows(o_piece, selector),
+    }
+    write_atlas(ATLAS_FILE, tiles)
+    print(f"wrote {ATLAS_FILE}: {len(tiles) + 1} tiles of {TILE_SIZE}x{TILE_SIZE}, "
+          f"{TILE_SIZE * ATLAS_TILES * TILE_SIZE // 8} bytes of pixels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Check moves.bin against a full minimax search.
+
+Run from the repo root on a computer after generating the table:
+
+    python3 tools/verify_move_table.py
+
+Every reachable position, without symmetry reduction, is looked up through move_table.MoveTable
+exactly like the badge does, and each cell outcome is compared with a plain minimax search
+that shares no code with the generator.
+"""
+import sys
+
+sys.path.insert(0, ".")
+
+# pylint: disable=wrong-import-position
+from move_table import OUTCOME_DRAW, OUTCOME_ILLEGAL, OUTCOME_LOSS, OUTCOME_WIN, MoveTable  # noqa: E402
+
+LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+)
+
+
+def has_line(cells, piece):
+    for a, b, c in LINES:
+        if cells[a] == cells[b] == cells[c] == piece:
+            return True
+    return False
+
+
+def minimax(cells, to_move):
+    """
+    full minimax search, returns 1 if to_move wins, 0 for a draw and -1 for a loss
+    """
+    other = "O" if to_move == "X" else "X"
+    if has_line(cells, other):
+        return -1
+    if " " not in cells:
+        return 0
+    best = -1
+    for cell in range(9):
+        if cells[cell] == " ":
+            cells[cell] = to_move
+            best = max(best, -minimax(cells, other))
+            cells[cell] = " "
+            if best == 1:
+                break
+    return best
+
+
+def expected_outcomes(cells, to_move):
+    other = "O" if to_move == "X" else "X"
+    outcomes = []
+    for cell in range(9):
+        if cells[cell] != " ":
+            outcomes.append(OUTCOME_ILLEGAL)
+            continue
+        cells[cell] = to_move
+        result = -minimax(cells, other)
+        cells[cell] = " "
+        outcomes.append({-1: OUTCOME_LOSS, 0: OUTCOME_DRAW, 1: OUTCOME_WIN}[result])
+    return outcomes
+
+
+def positions(cells, to_move, seen):
+    """
+    yields (cells, to_move) for every unfinished position reachable from cells
+    """
+    state = ("".join(cells), to_move)
+    if state in seen or has_line(cells, "X") or has_line(cells, "O") or " " not in cells:
+        return
+    seen.add(state)
+    yield cells, to_move
+    other = "O" if to_move == "X" else "X"
+    for cell in range(9):
+        if cells[cell] == " ":
+            cells[cell] = to_move
+            yield from positions(cells, other, seen)
+            cells[cell] = " "
+
+
+def to_masks(cells, to_move):
+    me_mask = 0
+    them_mask = 0
+    for cell in range(9):
+        if cells[cell] == to_move:
+            me_mask |= 1 << cell
+        elif cells[cell] != " ":
+            them_mask |= 1 << cell
+    return me_mask, them_mask
+
+
+def main():
+    move_table = MoveTable("moves.bin")
+    checked = 0
+    mismatches = 0
+    seen = set()
+    for starting_player in ("X", "O"):
+        for cells, to_move in positions([" "] * 9, starting_player, seen):
+            me_mask, them_mask = to_masks(cells, to_move)
+            actual = list(move_table.lookup(me_mask, them_mask))
+            expected = expected_outcomes(cells, to_move)
+            checked += 1
+            if actual != expected:
+                mismatches += 1
+                print(f"mismatch {''.join(cells)!r} {to_move} to move: table {actual} minimax {expected}")
+
+    print(f"checked {checked} positions against {move_table.count} table entries, {mismatches} mismatches")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()